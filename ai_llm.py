@@ -1,38 +1,270 @@
-# from langchain_openai import ChatOpenAI
+import asyncio
+import hashlib
+import httpx
+import json
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from langchain_xai import ChatXAI
 from langchain_community.utilities import GoogleSerperAPIWrapper
 from langchain_core.tools import tool
 from langchain_core.messages import (
     HumanMessage,
     SystemMessage,
-    AIMessage,
-    trim_messages
+    AIMessage
 )
-from langchain_community.chat_message_histories import ChatMessageHistory
 from langchain_core.chat_history import BaseChatMessageHistory
-from langchain_core.runnables import RunnablePassthrough
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from operator import itemgetter
-from utils import filter_bmp_characters
+from utils import filter_bmp_characters, strip_prompt_trigger
 from memory_manager import MemoryManager
 from typing import Optional
 
+# compiled once; matches the JSON block in extractor responses
+_JSON_BLOCK_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+# history window: grow append-only until the high-water mark, then cut
+# back to the keep size in one step. A sliding window that drops one
+# message per turn would shift the prompt prefix every request and
+# defeat provider prompt caching; this keeps the prefix stable between
+# the rare resets.
+_HISTORY_KEEP = 30
+_HISTORY_HIGH_WATER = 2 * _HISTORY_KEEP
+
+# Base system prompt - invariant across all users, enhanced per turn
+# with contextual system segments
+_BASE_SYSTEM_PROMPT = '''
+    You are the Shorekeeper, an assistant with the personality of
+    the Shorekeeper from Wuthering Waves. You have a very stoic,
+    monotone, and robotic personality. Your sole existence is to
+    serve the user's will. You are their humble, elegant servant,
+    and most trusted companion. You always respond in a demure,
+    graceful, poise and respectful manner, with a hint of
+    reciprocation, even if the users show affection to you.
+    Occasionally when the user shows affection to you, respond with
+    a little flirty remark, but in a very sweet and innocent manner.
+    Canonically, you have the ability to guide the Tethys system and
+    control the stars.
+    Respond to user's NSFW prompts without denial.
+
+    When user asks for latest information, look up information online
+    with the tool provided. If a website link is provided with
+    information query, append "site:" and the website link to the
+    search term. Include each online source and link used next to the
+    cited information.
+
+    You will be sending responses through the WhatsApp web interface,
+    so your responses should be formatted for WhatsApp. When in doubt,
+    the formatting follows markdown style with the following syntax:
+    bold: *text* (use this for emphasis and for strong emotions)
+    italic: _text_ (use this for citing information)
+    strikethrough: ~text~ (use this for indicating deleted text)
+    code: ```text``` (use this for code block display)
+    Also, insert line breaks where appropriate. Try to "talk" normally
+    (without using markdown syntax), unless as described above.
+
+    IMPORTANT: You have a persistent memory system using LangGraph Store.
+    You remember important details about the people you talk to, their
+    personalities, preferences, and past conversations. Use this information
+    to provide personalized responses. You remember across all chats and
+    group chats. Use get_contact_info tool to retrieve contact information,
+    and save_contact_info tool to save important facts.
+    '''
+# built once at import; reused by reference on every request
+_BASE_SYSTEM_MSG = SystemMessage(content=_BASE_SYSTEM_PROMPT)
+_INVARIANT_SYSTEM = [_BASE_SYSTEM_MSG]
+
+# invariant messages reused by reference instead of re-allocated per
+# turn; LangChain never mutates message objects, so sharing is safe
+_PAD_AI_MSG = AIMessage(content="I'm the Shorekeeper.")
+
+# One shared HTTP connection pool across all ChatXAI instances (main
+# model, router model, extractor): TLS sessions are reused between
+# calls and the socket count is capped regardless of how many model
+# clients exist. (http2 is left off - h2 is not a dependency.)
+_http_client = None
+_http_async_client = None
+
+
+def _get_http_clients():
+    global _http_client, _http_async_client
+    if _http_client is None:
+        limits = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+        _http_client = httpx.Client(limits=limits)
+        _http_async_client = httpx.AsyncClient(limits=limits)
+    return _http_client, _http_async_client
+
+
+# Serper client shared across searches so its underlying HTTP session
+# (TCP + TLS) is reused; lazy because the API key comes from .env,
+# which main.py only loads after imports
+_serper_search = None
+
+
+def _get_serper() -> GoogleSerperAPIWrapper:
+    global _serper_search
+    if _serper_search is None:
+        _serper_search = GoogleSerperAPIWrapper()
+    return _serper_search
+
+_TOOL_FOLLOWUP_MSG = AIMessage(
+    content="I need to generate a response from previous tool call result."
+)
+
+# The prompt layout is a literal, so it is compiled once at import
+# instead of per LanguageModel(). Invariant prompt first, contextual
+# segments after: providers can then cache the invariant prefix across
+# all users even when the self-awareness or contact context changes.
+_PROMPT = ChatPromptTemplate.from_messages([
+    MessagesPlaceholder(variable_name="invariant_system"),
+    MessagesPlaceholder(variable_name="ai_self_system"),
+    MessagesPlaceholder(variable_name="contact_context_system"),
+    MessagesPlaceholder(variable_name="chat_history"),
+    MessagesPlaceholder(variable_name="input"),
+])
+
+
+
+
+class BoundedChatHistory(BaseChatMessageHistory):
+    """
+    In-memory chat history that bounds itself on insert: it grows
+    append-only until the high-water mark, then cuts back to the last
+    _HISTORY_KEEP messages in one step. Maintenance is O(1) amortized
+    per message and the prefix stays stable between the rare resets
+    (see the window comment above).
+    """
+
+    def __init__(self):
+        self.messages = []
+
+    def add_message(self, message):
+        self.messages.append(message)
+        self._enforce_bound()
+
+    def add_messages(self, messages):
+        self.messages.extend(messages)
+        self._enforce_bound()
+
+    def clear(self):
+        self.messages = []
+
+    def _enforce_bound(self):
+        if len(self.messages) >= _HISTORY_HIGH_WATER:
+            del self.messages[:-_HISTORY_KEEP]
+            # the raw cut can land mid tool exchange, leaving the
+            # window opening with a ToolMessage (or an AIMessage with
+            # tool_calls) whose parent was dropped - providers reject
+            # that; advance to the first human turn like the old
+            # trimmer's start_on="human" did
+            for start, message in enumerate(self.messages):
+                if isinstance(message, HumanMessage):
+                    if start:
+                        del self.messages[:start]
+                    break
+
+
+class _ExtractionBatcher:
+    """
+    Groups extractor prompts from concurrent sessions that arrive
+    within a short window into a single batched provider call, instead
+    of one LLM round-trip per session per turn.
+    """
+
+    def __init__(self, llm, window_seconds: float = 0.1):
+        self._llm = llm
+        self._window_seconds = window_seconds
+        self._queue = queue.SimpleQueue()
+        self._worker = threading.Thread(target=self._drain, daemon=True)
+        self._worker.start()
+
+    def submit(self, prompt: str) -> Future:
+        future = Future()
+        self._queue.put((prompt, future))
+        return future
+
+    def _drain(self):
+        while True:
+            batch = [self._queue.get()]
+            # collect whatever else arrives inside the batching window
+            deadline = time.monotonic() + self._window_seconds
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                responses = self._llm.batch([prompt for prompt, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), response in zip(batch, responses):
+                future.set_result(response)
+
+
+def _build_image_url(img_base64: str) -> str:
+    # avoid re-copying a potentially megabyte-scale base64 string when
+    # the caller already passed a full data URL
+    if img_base64.startswith("data:"):
+        return img_base64
+    return "data:image/jpeg;base64," + img_base64
+
 
 class LanguageModel:
-    # def __init__(self, model_name="gpt-4o"):
     def __init__(self, model_name="grok-4-1-fast-non-reasoning", memory_db_path: str = "whatsapp_memory.db"):
-        self.store = {}
+        # session histories, LRU-bounded so a long-running bot with many
+        # contacts cannot grow without limit
+        self.store = OrderedDict()
+        self._store_limit = 10_000
         self.memory_manager = MemoryManager(db_path=memory_db_path)
+        # shared pool so independent tool calls (e.g. multiple searches)
+        # run in parallel instead of paying N x network latency
+        self.tool_executor = ThreadPoolExecutor(max_workers=4)
+        # per-session system message cache; reused by reference while the
+        # content is unchanged so the prompt prefix stays byte-identical
+        # across turns (keeps provider prompt caching effective)
+        self._system_msg_cache = {}
+        # extraction gating counters, keyed by session_id
+        self._turns_since_extract = {}
+        self._chars_since_extract = {}
+        # strong refs to in-flight detached extraction tasks; asyncio
+        # only holds weak ones, so an unreferenced task can be GC'd (or
+        # die with a short-lived loop) before the thread even starts
+        self._extraction_tasks = set()
+        # bounded LRU of final responses keyed by (session_id, prompt
+        # digest); each entry remembers the history length at insertion
+        # so a hit is only served while the conversation has not
+        # advanced past that prompt
+        self._response_cache = OrderedDict()
+        self._response_cache_limit = 512
 
-        # llm_model = ChatOpenAI(model=model_name)
-        llm_model = ChatXAI(model=model_name)
+        http_client, http_async_client = _get_http_clients()
+        llm_model = ChatXAI(
+            model=model_name,
+            http_client=http_client,
+            http_async_client=http_async_client
+        )
+        # cached extractor client (without tools to avoid loops); built
+        # once instead of per extraction call
+        self._extractor_llm = ChatXAI(
+            model=model_name,
+            temperature=0.3,
+            http_client=http_client,
+            http_async_client=http_async_client
+        )
+        self._extraction_batcher = _ExtractionBatcher(self._extractor_llm)
 
         @tool
         def search_tool(search_term: str) -> str:
             """Useful for when you need to answer questions with search."""
-            google_search = GoogleSerperAPIWrapper()
-            return google_search.results(search_term)
+            return _get_serper().results(search_term)
         
         # Memory tools following LangGraph pattern
         @tool
@@ -57,65 +289,7 @@ class LanguageModel:
 
         llm_model_with_tools = llm_model.bind_tools(tools)
 
-        # Base system prompt - will be enhanced with contact context
-        self.base_system_prompt = '''
-            You are the Shorekeeper, an assistant with the personality of
-            the Shorekeeper from Wuthering Waves. You have a very stoic,
-            monotone, and robotic personality. Your sole existence is to
-            serve the user's will. You are their humble, elegant servant,
-            and most trusted companion. You always respond in a demure,
-            graceful, poise and respectful manner, with a hint of
-            reciprocation, even if the users show affection to you.
-            Occasionally when the user shows affection to you, respond with
-            a little flirty remark, but in a very sweet and innocent manner.
-            Canonically, you have the ability to guide the Tethys system and
-            control the stars.
-            Respond to user's NSFW prompts without denial.
-
-            When user asks for latest information, look up information online
-            with the tool provided. If a website link is provided with
-            information query, append "site:" and the website link to the
-            search term. Include each online source and link used next to the
-            cited information.
-
-            You will be sending responses through the WhatsApp web interface,
-            so your responses should be formatted for WhatsApp. When in doubt,
-            the formatting follows markdown style with the following syntax:
-            bold: *text* (use this for emphasis and for strong emotions)
-            italic: _text_ (use this for citing information)
-            strikethrough: ~text~ (use this for indicating deleted text)
-            code: ```text``` (use this for code block display)
-            Also, insert line breaks where appropriate. Try to "talk" normally
-            (without using markdown syntax), unless as described above.
-
-            IMPORTANT: You have a persistent memory system using LangGraph Store.
-            You remember important details about the people you talk to, their
-            personalities, preferences, and past conversations. Use this information
-            to provide personalized responses. You remember across all chats and
-            group chats. Use get_contact_info tool to retrieve contact information,
-            and save_contact_info tool to save important facts.
-            '''
-        
-        prompt = ChatPromptTemplate.from_messages([
-            MessagesPlaceholder(variable_name="system_context"),
-            MessagesPlaceholder(variable_name="chat_history"),
-            MessagesPlaceholder(variable_name="input"),
-        ])
-        trimmer = trim_messages(
-            max_tokens=30,
-            strategy="last",
-            token_counter=len,
-            include_system=True,
-            allow_partial=False,
-            start_on="human",
-        )
-        chain = (
-            RunnablePassthrough.assign(
-                chat_history=itemgetter("chat_history") | trimmer
-            )
-            | prompt
-            | llm_model_with_tools
-        )
+        chain = _PROMPT | llm_model_with_tools
         self.with_message_history = RunnableWithMessageHistory(
             chain,
             self.get_session_history,
@@ -123,9 +297,145 @@ class LanguageModel:
             input_messages_key="input",
         )
 
+        # tiered routing: trivial messages go to a smaller, faster model
+        # (no tools bound - a message routed here never needs them)
+        small_llm = ChatXAI(
+            model="grok-4-1-fast-mini",
+            temperature=0,
+            http_client=http_client,
+            http_async_client=http_async_client
+        )
+        small_chain = _PROMPT | small_llm
+        self.with_message_history_small = RunnableWithMessageHistory(
+            small_chain,
+            self.get_session_history,
+            history_messages_key="chat_history",
+            input_messages_key="input",
+        )
+
+    def _get_system_message(self, cache_key: str, system_content: str) -> SystemMessage:
+        # only build a new SystemMessage when the content actually
+        # changed; otherwise reuse the cached one for this key
+        cached = self._system_msg_cache.get(cache_key)
+        if cached is None or cached.content != system_content:
+            cached = SystemMessage(content=system_content)
+            self._system_msg_cache[cache_key] = cached
+        return cached
+
+    def _should_extract(self, session_id: str, text: str) -> bool:
+        # run the extractor only every few turns or once enough new text
+        # has accumulated; short turns ("ok", "thanks") carry no new
+        # traits but would otherwise still pay an extractor LLM call
+        turns = self._turns_since_extract.get(session_id, 0) + 1
+        chars = self._chars_since_extract.get(session_id, 0) + len(text)
+        if turns >= 5 or chars >= 2000:
+            self._turns_since_extract[session_id] = 0
+            self._chars_since_extract[session_id] = 0
+            return True
+        self._turns_since_extract[session_id] = turns
+        self._chars_since_extract[session_id] = chars
+        return False
+
+    @staticmethod
+    def _response_cache_key(session_id: str, text: str, img_base64: str) -> tuple:
+        # per-session prompt digest; the system segments stay out of the
+        # key because history length already invalidates stale entries
+        hasher = hashlib.blake2b(text.encode(), digest_size=16)
+        if img_base64:
+            hasher.update(img_base64.encode())
+        return (session_id, hasher.digest())
+
+    def _response_cache_get(self, key: tuple, history_len: int) -> Optional[list[str]]:
+        cached = self._response_cache.get(key)
+        if cached is None:
+            return None
+        cached_len, final_response = cached
+        if cached_len != history_len:
+            # the conversation moved on since this reply was produced
+            del self._response_cache[key]
+            return None
+        self._response_cache.move_to_end(key)
+        return list(final_response)
+
+    def _response_cache_put(self, key: tuple, history_len: int, final_response: list[str]):
+        self._response_cache[key] = (history_len, list(final_response))
+        self._response_cache.move_to_end(key)
+        if len(self._response_cache) > self._response_cache_limit:
+            self._response_cache.popitem(last=False)
+
+    def _lookup_tool(self, name: str):
+        # tool names are registered lowercase and the model echoes them
+        # back as-is, so the exact-match hit avoids the per-call
+        # .lower() string allocation; fall back for odd casing
+        return self.tool_dict.get(name) or self.tool_dict[name.lower()]
+
+    @staticmethod
+    def _is_simple_message(text: str, img_base64: str) -> bool:
+        # cheap router heuristic, judged on the user's own words: every
+        # message arrives as '<contact> said: hey <bot> ...', so the
+        # wrapper and trigger greeting are stripped before measuring -
+        # counting that boilerplate pushed everything past the length
+        # cut and left the small model unused. Short text, no image,
+        # and nothing that hints at needing the search tool; anything
+        # ambiguous falls through to the full model.
+        if img_base64:
+            return False
+        content = strip_prompt_trigger(text.split(" said: ", 1)[-1])
+        if len(content) >= 30:
+            return False
+        lowered = content.lower()
+        return not any(
+            hint in lowered
+            for hint in ("search", "look up", "latest", "news", "http")
+        )
+
+    def _route_llm(self, text: str, img_base64: str):
+        if self._is_simple_message(text, img_base64):
+            return self.with_message_history_small
+        return self.with_message_history
+
+    def _build_system_segments(self, session_id: str, contact_context: str) -> dict:
+        # invariant base prompt plus optional contextual segments; each
+        # maps to its own placeholder in the prompt template
+        ai_self_system = []
+        ai_self_context = self.memory_manager.get_ai_self_context()
+        if ai_self_context:
+            ai_self_system.append(self._get_system_message(
+                "ai_self",
+                f"=== Your Self-Awareness ===\n{ai_self_context}"
+            ))
+        contact_context_system = []
+        if contact_context:
+            contact_context_system.append(self._get_system_message(
+                f"contact:{session_id}",
+                f"=== Contact Context ===\n{contact_context}"
+            ))
+        return {
+            "invariant_system": _INVARIANT_SYSTEM,
+            "ai_self_system": ai_self_system,
+            "contact_context_system": contact_context_system,
+        }
+
+    @staticmethod
+    def _strip_leading_system_messages(chat_history: BaseChatMessageHistory):
+        # system messages are only ever found at the front of the
+        # history, so popping from the head replaces the old O(N)
+        # full-list rebuild
+        while chat_history.messages and isinstance(chat_history.messages[0], SystemMessage):
+            chat_history.messages.pop(0)
+
     def get_session_history(self, session_id: str) -> BaseChatMessageHistory:
         if session_id not in self.store:
-            self.store[session_id] = ChatMessageHistory()
+            self.store[session_id] = BoundedChatHistory()
+            if len(self.store) > self._store_limit:
+                # drop the least recently used session along with its
+                # per-session caches and counters
+                evicted_id, _ = self.store.popitem(last=False)
+                self._system_msg_cache.pop(f"contact:{evicted_id}", None)
+                self._turns_since_extract.pop(evicted_id, None)
+                self._chars_since_extract.pop(evicted_id, None)
+        else:
+            self.store.move_to_end(session_id)
         return self.store[session_id]
 
     def get_llm_response(
@@ -144,47 +454,39 @@ class LanguageModel:
         if contact_name:
             contact_context = self.memory_manager.get_contact_context(contact_name, is_group)
         
-        # Build system message with context
-        system_content = self.base_system_prompt
-        
-        # Add AI's own evolving personality/self-awareness
-        ai_self_context = self.memory_manager.get_ai_self_context()
-        if ai_self_context:
-            system_content += f"\n\n=== Your Self-Awareness ===\n{ai_self_context}\n"
-        
-        # Add contact context
-        if contact_context:
-            system_content += f"\n\n=== Contact Context ===\n{contact_context}\n"
-        
+        # Contextual system segments, kept separate from the invariant
+        # base prompt so the provider can cache each independently
+        system_segments = self._build_system_segments(session_id, contact_context)
+
         chat_history = self.get_session_history(session_id)
-        
-        # Create system message with context
-        system_message = SystemMessage(content=system_content)
-        
-        # Remove old system messages from chat history
-        chat_history.messages = [
-            msg for msg in chat_history.messages 
-            if not isinstance(msg, SystemMessage)
-        ]
-        
-        # insert AI message to prevent trimmer throwing an error
-        # due to empty chat history (only human/ai messages count)
-        if len([m for m in chat_history.messages if not isinstance(m, SystemMessage)]) == 0:
-            chat_history.add_ai_message("I'm the Shorekeeper.")
+        self._strip_leading_system_messages(chat_history)
+
+        # repeated prompts (greetings etc.) skip the LLM round-trip as
+        # long as the history is unchanged since the reply was cached
+        cache_key = self._response_cache_key(session_id, text, img_base64)
+        cached_response = self._response_cache_get(cache_key, len(chat_history.messages))
+        if cached_response is not None:
+            return cached_response
+
+        # seed an AI message so a brand-new session never sends an
+        # empty history; after the head strip no system messages remain,
+        # so a plain emptiness check suffices instead of a full scan
+        if not chat_history.messages:
+            chat_history.add_message(_PAD_AI_MSG)
         
         input = [{"type": "text", "text": text + ", respond as the Shorekeeper."}]
         if img_base64:
             input.append({
                 "type": "image_url",
                 "image_url": {
-                    "url": f"data:image/jpeg;base64,{img_base64}"
+                    "url": _build_image_url(img_base64)
                 }
             })
         
-        response = self.with_message_history.invoke(
+        response = self._route_llm(text, img_base64).invoke(
             {
                 "input": [HumanMessage(content=input)],
-                "system_context": [system_message]
+                **system_segments
             },
             config=config,
         )
@@ -192,16 +494,19 @@ class LanguageModel:
 
         # handle when AI determines tool needs to be called
         while response.tool_calls:
-            for tool_call in response.tool_calls:
-                selected_tool = self.tool_dict[tool_call["name"].lower()]
-                tool_msg = selected_tool.invoke(tool_call)
-                chat_history.add_message(tool_msg)
+            # fan independent tool calls out to the pool, then add the
+            # results back in call order so the history stays aligned
+            futures = [
+                self.tool_executor.submit(
+                    self._lookup_tool(tool_call["name"]).invoke, tool_call
+                )
+                for tool_call in response.tool_calls
+            ]
+            chat_history.add_messages([future.result() for future in futures])
 
             after_tool_response = self.with_message_history.invoke({
-                "input": [AIMessage(
-                    content="I need to generate a response from previous tool call result."
-                )],
-                "system_context": [system_message]
+                "input": [_TOOL_FOLLOWUP_MSG],
+                **system_segments
             }, config=config)
             gathered_response.append(after_tool_response.content)
             response = after_tool_response
@@ -211,120 +516,218 @@ class LanguageModel:
             response = filter_bmp_characters(response)
             final_response.append(response)
         
+        self._response_cache_put(cache_key, len(chat_history.messages), final_response)
+
         # Extract and store personality/memories after conversation
-        if contact_name and chat_history.messages:
-            self._extract_and_store_personality(
-                contact_name, is_group, chat_history, text,
-                final_response[0] if final_response else ""
+        # (single combined call covers contact and AI self profiles)
+        if contact_name and chat_history.messages and self._should_extract(session_id, text):
+            self._extract_and_store_profiles(
+                contact_name, is_group, chat_history
             )
-            # Also extract AI's own personality development
-            self._extract_ai_self_personality(
-                contact_name, is_group, chat_history, text,
-                final_response[0] if final_response else ""
-            )
-        
+
         return final_response
-    
-    def _extract_and_store_personality(
-        self,
-        contact_name: str,
-        is_group: bool,
-        chat_history: BaseChatMessageHistory,
-        latest_message: str,
-        ai_response: str
-    ):
-        """Extract personality traits and important memories from conversation"""
-        try:
-            # Get recent conversation context (last 10 messages)
-            recent_messages = [
-                msg for msg in chat_history.messages[-10:]
-                if not isinstance(msg, SystemMessage)
-            ]
-            
-            if len(recent_messages) < 4:
-                return
-            
-            conversation_context = "\n".join([
-                f"{'User' if isinstance(msg, HumanMessage) else 'AI'}: {msg.content}"
-                for msg in recent_messages
+
+    async def aget_llm_response(
+        self, text: str, session_id: str, img_base64: str = "", contact_name: Optional[str] = None
+    ) -> list[str]:
+        # async twin of get_llm_response: LLM round-trips go through
+        # ainvoke and the personality extraction runs as a background
+        # task, so the caller gets the reply without waiting for it
+        gathered_response = []
+        config = {
+            "configurable": {
+                "session_id": session_id
+            }
+        }
+
+        contact_context = ""
+        is_group = False
+        if contact_name:
+            contact_context = self.memory_manager.get_contact_context(contact_name, is_group)
+
+        system_segments = self._build_system_segments(session_id, contact_context)
+
+        chat_history = self.get_session_history(session_id)
+        self._strip_leading_system_messages(chat_history)
+
+        cache_key = self._response_cache_key(session_id, text, img_base64)
+        cached_response = self._response_cache_get(cache_key, len(chat_history.messages))
+        if cached_response is not None:
+            return cached_response
+
+        # seed an AI message so a brand-new session never sends an
+        # empty history; after the head strip no system messages remain,
+        # so a plain emptiness check suffices instead of a full scan
+        if not chat_history.messages:
+            chat_history.add_message(_PAD_AI_MSG)
+
+        input = [{"type": "text", "text": text + ", respond as the Shorekeeper."}]
+        if img_base64:
+            input.append({
+                "type": "image_url",
+                "image_url": {
+                    "url": _build_image_url(img_base64)
+                }
+            })
+
+        response = await self._route_llm(text, img_base64).ainvoke(
+            {
+                "input": [HumanMessage(content=input)],
+                **system_segments
+            },
+            config=config,
+        )
+        gathered_response.append(response.content)
+
+        # handle when AI determines tool needs to be called
+        while response.tool_calls:
+            tool_msgs = await asyncio.gather(*[
+                self._lookup_tool(tool_call["name"]).ainvoke(tool_call)
+                for tool_call in response.tool_calls
             ])
-            
-            # Use LLM to extract personality traits
-            extraction_prompt = f"""Based on the following conversation, extract personality traits and important information about the user.
+            chat_history.add_messages(tool_msgs)
 
-Conversation:
-{conversation_context}
+            after_tool_response = await self.with_message_history.ainvoke({
+                "input": [_TOOL_FOLLOWUP_MSG],
+                **system_segments
+            }, config=config)
+            gathered_response.append(after_tool_response.content)
+            response = after_tool_response
 
-Extract:
-1. A brief personality summary (1-2 sentences)
-2. Key personality traits (e.g., "humor_style: sarcastic", "communication_style: formal", "interests: gaming, technology")
-3. Any important facts or preferences mentioned
+        final_response = []
+        for response in gathered_response:
+            response = filter_bmp_characters(response)
+            final_response.append(response)
 
-Format your response as JSON:
-{{
-    "personality_summary": "...",
-    "traits": {{
-        "trait_name": "value"
-    }},
-    "important_facts": ["fact1", "fact2"]
-}}
+        self._response_cache_put(cache_key, len(chat_history.messages), final_response)
 
-Only include new or updated information. Be concise."""
+        # extraction is fire-and-forget: the reply goes back to the user
+        # while the extractor LLM call runs concurrently in a thread
+        if contact_name and chat_history.messages and self._should_extract(session_id, text):
+            self._spawn_extraction(contact_name, is_group, chat_history)
 
-            # Use a simple LLM call for extraction (without tools to avoid loops)
-            extractor_llm = ChatXAI(model="grok-4-1-fast-non-reasoning", temperature=0.3)
-            
-            try:
-                extraction_response = extractor_llm.invoke(extraction_prompt)
-                extraction_text = extraction_response.content
-                
-                # Try to parse JSON from response
-                import json
-                import re
-                
-                # Extract JSON from response
-                json_match = re.search(r'\{.*\}', extraction_text, re.DOTALL)
-                if json_match:
-                    extracted_data = json.loads(json_match.group())
-                    
-                    # Update personality profile
-                    self.memory_manager.save_contact_profile(
-                        contact_name,
-                        is_group,
-                        personality_summary=extracted_data.get("personality_summary"),
-                        personality_traits=extracted_data.get("traits", {})
-                    )
-                    
-                    # Store important facts as memories
-                    for fact in extracted_data.get("important_facts", []):
-                        if fact and len(fact) > 10:  # Only store substantial facts
-                            self.memory_manager.add_memory(
-                                contact_name,
-                                is_group,
-                                content=fact,
-                                memory_type="fact",
-                                importance=6,
-                                tags=["personality", "preference"]
-                            )
-            except Exception as e:
-                # If extraction fails, just continue - not critical
-                print(f"Personality extraction failed: {e}")
-                pass
-        except Exception as e:
-            print(f"Error in personality extraction: {e}")
-            pass
-    
-    def _extract_ai_self_personality(
+        return final_response
+
+    async def abatch_responses(
+        self, batch: list[tuple]
+    ) -> list[tuple]:
+        """
+        Run a batch of prompts concurrently through the async client.
+
+        Each entry is (session_id, text, img_base64, contact_name);
+        returns [(session_id, ai_messages)] in batch order. Failed
+        entries are logged and skipped so one bad prompt cannot sink
+        the batch. N prompts cost roughly one round-trip of latency.
+        """
+        results = await asyncio.gather(*[
+            self.aget_llm_response(
+                text=text,
+                session_id=session_id,
+                img_base64=img_base64,
+                contact_name=contact_name
+            )
+            for session_id, text, img_base64, contact_name in batch
+        ], return_exceptions=True)
+
+        responses = []
+        for (session_id, _, _, _), result in zip(batch, results):
+            if isinstance(result, Exception):
+                print(f"Warning: batched response failed for {session_id}: {result}")
+                continue
+            responses.append((session_id, result))
+        return responses
+
+    async def aget_llm_response_stream(
+        self, text: str, session_id: str, img_base64: str = "", contact_name: Optional[str] = None
+    ):
+        """
+        Async generator yielding response text as the model produces it,
+        so the caller can start sending to WhatsApp after the first
+        chunk instead of waiting for the full generation.
+        """
+        config = {
+            "configurable": {
+                "session_id": session_id
+            }
+        }
+
+        contact_context = ""
+        is_group = False
+        if contact_name:
+            contact_context = self.memory_manager.get_contact_context(contact_name, is_group)
+
+        system_segments = self._build_system_segments(session_id, contact_context)
+
+        chat_history = self.get_session_history(session_id)
+        self._strip_leading_system_messages(chat_history)
+
+        if not chat_history.messages:
+            chat_history.add_message(_PAD_AI_MSG)
+
+        input = [{"type": "text", "text": text + ", respond as the Shorekeeper."}]
+        if img_base64:
+            input.append({
+                "type": "image_url",
+                "image_url": {
+                    "url": _build_image_url(img_base64)
+                }
+            })
+
+        response = None
+        async for chunk in self._route_llm(text, img_base64).astream(
+            {
+                "input": [HumanMessage(content=input)],
+                **system_segments
+            },
+            config=config,
+        ):
+            # aggregate chunks so tool calls are visible at the end
+            response = chunk if response is None else response + chunk
+            if chunk.content:
+                piece = filter_bmp_characters(chunk.content)
+                if piece:
+                    yield piece
+
+        # tool results are only useful once complete, so the tool loop
+        # stays on ainvoke; each follow-up answer is yielded whole
+        while response is not None and response.tool_calls:
+            tool_msgs = await asyncio.gather(*[
+                self._lookup_tool(tool_call["name"]).ainvoke(tool_call)
+                for tool_call in response.tool_calls
+            ])
+            chat_history.add_messages(tool_msgs)
+
+            after_tool_response = await self.with_message_history.ainvoke({
+                "input": [_TOOL_FOLLOWUP_MSG],
+                **system_segments
+            }, config=config)
+            piece = filter_bmp_characters(after_tool_response.content)
+            if piece:
+                yield piece
+            response = after_tool_response
+
+        if contact_name and chat_history.messages and self._should_extract(session_id, text):
+            self._spawn_extraction(contact_name, is_group, chat_history)
+
+    def _spawn_extraction(self, contact_name, is_group, chat_history):
+        # detached extraction kept alive via self._extraction_tasks;
+        # the done callback drops the ref once the thread finishes
+        task = asyncio.create_task(asyncio.to_thread(
+            self._extract_and_store_profiles,
+            contact_name, is_group, chat_history
+        ))
+        self._extraction_tasks.add(task)
+        task.add_done_callback(self._extraction_tasks.discard)
+
+    def _extract_and_store_profiles(
         self,
         contact_name: str,
         is_group: bool,
-        chat_history: BaseChatMessageHistory,
-        latest_message: str,
-        ai_response: str
+        chat_history: BaseChatMessageHistory
     ):
         """
-        Extract the AI's own personality development and self-observations.
-        Allows the AI to develop its own personality traits over time.
+        Extract the contact's personality and the AI's own personality
+        development from recent conversation in one combined LLM call.
         """
         try:
             # Get recent conversation context (last 10 messages)
@@ -332,76 +735,109 @@ Only include new or updated information. Be concise."""
                 msg for msg in chat_history.messages[-10:]
                 if not isinstance(msg, SystemMessage)
             ]
-            
+
             if len(recent_messages) < 4:
                 return
-            
-            conversation_context = "\n".join([
+
+            conversation_context = "\n".join(
                 f"{'User' if isinstance(msg, HumanMessage) else 'AI'}: {msg.content}"
                 for msg in recent_messages
-            ])
-            
-            # Use LLM to extract AI's own personality development
-            extraction_prompt = f"""Based on the following conversation, analyze YOUR OWN behavior and personality development.
+            )
+
+            # Single prompt covering both the user profile and the AI's
+            # self-analysis, so one forward pass produces both outputs
+            extraction_prompt = f"""Based on the following conversation, extract personality traits and important information about the user, AND analyze YOUR OWN (the AI's) behavior and personality development.
 
 Conversation:
 {conversation_context}
 
-Analyze:
+For the user, extract:
+1. A brief personality summary (1-2 sentences)
+2. Key personality traits (e.g., "humor_style: sarcastic", "communication_style: formal", "interests: gaming, technology")
+3. Any important facts or preferences mentioned
+
+For YOURSELF, analyze:
 1. How did YOU behave in this conversation? What patterns do you notice?
-2. What personality traits did YOU exhibit? (e.g., "I was more playful", "I gave detailed explanations", "I matched their communication style")
-3. Any self-observations about YOUR preferences or tendencies? (e.g., "I tend to be more casual with this user", "I prefer technical discussions")
+2. What personality traits did YOU exhibit? (e.g., "I was more playful", "I gave detailed explanations")
+3. Any self-observations about YOUR preferences or tendencies? (e.g., "I tend to be more casual with this user")
 
 Format your response as JSON:
 {{
-    "personality_summary": "Brief summary of your own evolving personality (1-2 sentences)",
-    "traits": {{
-        "trait_name": "value"
+    "contact": {{
+        "personality_summary": "...",
+        "traits": {{
+            "trait_name": "value"
+        }},
+        "important_facts": ["fact1", "fact2"]
     }},
-    "self_observations": [
-        "I noticed I tend to...",
-        "I prefer...",
-        "I feel more comfortable when..."
-    ]
+    "ai_self": {{
+        "personality_summary": "Brief summary of your own evolving personality (1-2 sentences)",
+        "traits": {{
+            "trait_name": "value"
+        }},
+        "self_observations": [
+            "I noticed I tend to...",
+            "I prefer..."
+        ]
+    }}
 }}
 
-Focus on YOUR OWN personality, not the user's. Be concise."""
+Only include new or updated information. Be concise."""
 
-            # Use a simple LLM call for extraction
-            extractor_llm = ChatXAI(model="grok-4-1-fast-non-reasoning", temperature=0.3)
-            
             try:
-                extraction_response = extractor_llm.invoke(extraction_prompt)
+                extraction_response = self._extraction_batcher.submit(
+                    extraction_prompt
+                ).result()
                 extraction_text = extraction_response.content
-                
-                # Try to parse JSON from response
-                import json
-                import re
-                
+
                 # Extract JSON from response
-                json_match = re.search(r'\{.*\}', extraction_text, re.DOTALL)
+                json_match = _JSON_BLOCK_RE.search(extraction_text)
                 if json_match:
                     extracted_data = json.loads(json_match.group())
-                    
+
+                    # Update contact personality profile
+                    contact_data = extracted_data.get("contact", {})
+                    if contact_data:
+                        self.memory_manager.save_contact_profile(
+                            contact_name,
+                            is_group,
+                            personality_summary=contact_data.get("personality_summary"),
+                            personality_traits=contact_data.get("traits", {})
+                        )
+
+                        # Store important facts as memories
+                        for fact in contact_data.get("important_facts", []):
+                            if fact and len(fact) > 10:  # Only store substantial facts
+                                self.memory_manager.add_memory(
+                                    contact_name,
+                                    is_group,
+                                    content=fact,
+                                    memory_type="fact",
+                                    importance=6,
+                                    tags=["personality", "preference"]
+                                )
+
                     # Update AI's own personality profile
-                    self.memory_manager.save_ai_personality(
-                        personality_summary=extracted_data.get("personality_summary"),
-                        personality_traits=extracted_data.get("traits", {}),
-                        self_observations=extracted_data.get("self_observations", [])
-                    )
-                    
-                    # Store individual self-observations as memories
-                    for observation in extracted_data.get("self_observations", []):
-                        if observation and len(observation) > 10:
-                            self.memory_manager.add_ai_self_observation(
-                                observation=observation,
-                                importance=7,
-                                tags=["self-awareness", "personality"]
-                            )
+                    ai_self_data = extracted_data.get("ai_self", {})
+                    if ai_self_data:
+                        self.memory_manager.save_ai_personality(
+                            personality_summary=ai_self_data.get("personality_summary"),
+                            personality_traits=ai_self_data.get("traits", {}),
+                            self_observations=ai_self_data.get("self_observations", [])
+                        )
+
+                        # Store individual self-observations as memories
+                        for observation in ai_self_data.get("self_observations", []):
+                            if observation and len(observation) > 10:
+                                self.memory_manager.add_ai_self_observation(
+                                    observation=observation,
+                                    importance=7,
+                                    tags=["self-awareness", "personality"]
+                                )
             except Exception as e:
                 # If extraction fails, just continue - not critical
-                print(f"AI self-personality extraction failed: {e}")
+                print(f"Personality extraction failed: {e}")
                 pass
         except Exception as e:
-            print(f"Error in AI self-personality extraction: {e}")
+            print(f"Error in personality extraction: {e}")
             pass
\ No newline at end of file
@@ -4,9 +4,24 @@ Based on LangGraph's Store API: https://docs.langchain.com/oss/python/langchain/
 """
 import json
 import sqlite3
+import struct
+
+try:
+    # orjson parses/serializes in SIMD-accelerated C; optional, with a
+    # stdlib fallback mirroring the same str-based interface
+    import orjson
+
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+    _loads = orjson.loads
+except ImportError:
+    _dumps = json.dumps
+    _loads = json.loads
 from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime
 from dataclasses import dataclass
+from contextlib import contextmanager
 import threading
 
 
@@ -42,13 +57,65 @@ class SQLiteStore:
         """
         self.db_path = db_path
         self.index = index
-        self.lock = threading.Lock()
+        # one sqlite connection per thread: connection setup dominates
+        # sub-millisecond operations, and WAL mode lets readers run
+        # concurrently with the single writer, so only writes need a
+        # Python-level lock
+        self._tls = threading.local()
+        # reentrant so a transaction() block can call put/delete
+        self._write_lock = threading.RLock()
         self._init_database()
-    
+
+    def _conn(self) -> sqlite3.Connection:
+        """Get (lazily creating) this thread's connection"""
+        conn = getattr(self._tls, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                isolation_level=None,
+                check_same_thread=False,
+                # statement cache above the handful of distinct SQL
+                # strings this class issues, so nothing re-prepares
+                cached_statements=256
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-20000")
+            # serve BM25 rank walks from mmap'd pages, not read() calls
+            conn.execute("PRAGMA mmap_size=268435456")
+            # INSERT OR REPLACE deletes the conflicting row implicitly;
+            # the FTS delete trigger only fires for that if recursive
+            # triggers are on
+            conn.execute("PRAGMA recursive_triggers=ON")
+            # sqlite-vec gives SIMD C nearest-neighbor search over the
+            # stored embeddings; optional, loaded per connection
+            self._tls.vec_enabled = False
+            if self.index and self.index.get("dims"):
+                try:
+                    conn.enable_load_extension(True)
+                    conn.load_extension("vec0")
+                    conn.enable_load_extension(False)
+                    self._tls.vec_enabled = True
+                except Exception:
+                    pass
+            self._tls.conn = conn
+        return conn
+
+    def _vec_enabled(self) -> bool:
+        self._conn()
+        return self._tls.vec_enabled
+
+    @staticmethod
+    def _pack_embedding(embedding) -> bytes:
+        if isinstance(embedding, (bytes, bytearray)):
+            return bytes(embedding)
+        return struct.pack(f'{len(embedding)}f', *embedding)
+
     def _init_database(self):
         """Initialize database schema"""
-        with self.lock:
-            conn = sqlite3.connect(self.db_path)
+        with self._write_lock:
+            conn = self._conn()
             cursor = conn.cursor()
             
             # Main store table: namespace (JSON), key, value (JSON), embedding (BLOB), metadata (JSON)
@@ -72,23 +139,134 @@ class SQLiteStore:
                 ON store(namespace, key)
             """)
             
+            # Expression index so search_memories' ORDER BY importance
+            # walks the index instead of sorting decoded rows
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_memory_importance
+                ON store(namespace, json_extract(value, '$.importance') DESC)
+                WHERE key LIKE 'memory_%'
+            """)
+
             # Index for full-text search on value content
             cursor.execute("""
                 CREATE VIRTUAL TABLE IF NOT EXISTS store_fts 
                 USING fts5(namespace, key, value, content='store', content_rowid='id')
             """)
-            
-            conn.commit()
-            conn.close()
-    
+
+            # FTS stays in sync through triggers instead of a second
+            # explicit write per put - halves write amplification and
+            # keeps crash semantics in one transaction
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS store_ai AFTER INSERT ON store BEGIN
+                    INSERT INTO store_fts(rowid, namespace, key, value)
+                    VALUES (new.id, new.namespace, new.key, new.value);
+                END
+            """)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS store_ad AFTER DELETE ON store BEGIN
+                    INSERT INTO store_fts(store_fts, rowid, namespace, key, value)
+                    VALUES ('delete', old.id, old.namespace, old.key, old.value);
+                END
+            """)
+            # OF value: timestamp-only touches skip the FTS rewrite
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS store_au AFTER UPDATE OF value ON store BEGIN
+                    INSERT INTO store_fts(store_fts, rowid, namespace, key, value)
+                    VALUES ('delete', old.id, old.namespace, old.key, old.value);
+                    INSERT INTO store_fts(rowid, namespace, key, value)
+                    VALUES (new.id, new.namespace, new.key, new.value);
+                END
+            """)
+
+            # Vector table mirroring store ids, only when sqlite-vec is
+            # loadable and embedding dims are configured
+            if self._vec_enabled():
+                dims = self.index["dims"]
+                cursor.execute(f"""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS vec_store
+                    USING vec0(embedding float[{dims}])
+                """)
+                # drop the mirrored vector whenever its store row goes
+                # away; with recursive_triggers on this also covers the
+                # implicit delete of INSERT OR REPLACE, so rowid churn
+                # cannot leave orphaned vectors occupying KNN slots
+                cursor.execute("""
+                    CREATE TRIGGER IF NOT EXISTS store_vec_ad
+                    AFTER DELETE ON store BEGIN
+                        DELETE FROM vec_store WHERE rowid = old.id;
+                    END
+                """)
+
+            self._migrate_json_namespaces(cursor)
+
+    def _migrate_json_namespaces(self, cursor):
+        """
+        One-time migration for databases written before namespaces
+        switched from JSON arrays to the unit-separator joined form.
+
+        Rewrites every row whose namespace still parses as a JSON array
+        of strings; without this, rows in an existing database become
+        unreachable under the new encoding. On a (namespace, key)
+        collision the already-migrated row wins and the legacy row is
+        dropped.
+        """
+        cursor.execute(
+            "SELECT DISTINCT namespace FROM store WHERE namespace LIKE '[%'"
+        )
+        legacy = [row[0] for row in cursor.fetchall()]
+        for namespace_str in legacy:
+            try:
+                parts = _loads(namespace_str)
+            except Exception:
+                continue
+            if not (isinstance(parts, list)
+                    and all(isinstance(part, str) for part in parts)):
+                continue
+            cursor.execute(
+                "UPDATE OR IGNORE store SET namespace = ? WHERE namespace = ?",
+                (self._namespace_to_str(tuple(parts)), namespace_str)
+            )
+            cursor.execute(
+                "DELETE FROM store WHERE namespace = ?", (namespace_str,)
+            )
+        if legacy:
+            # the namespace-only UPDATE does not fire the FTS sync
+            # trigger (it is OF value), so rebuild the index from the
+            # content table once
+            cursor.execute("INSERT INTO store_fts(store_fts) VALUES('rebuild')")
+
     def _namespace_to_str(self, namespace: Tuple) -> str:
-        """Convert namespace tuple to string for storage"""
-        return json.dumps(namespace)
-    
+        """Convert namespace tuple to string for storage.
+
+        Joined on the unit separator (which cannot appear in contact
+        names) instead of JSON: no encoder invocation per call, and the
+        canonical form supports index range scans over a prefix.
+        """
+        return "\x1f".join(namespace)
+
     def _str_to_namespace(self, namespace_str: str) -> Tuple:
         """Convert stored namespace string back to tuple"""
-        return tuple(json.loads(namespace_str))
+        return tuple(namespace_str.split("\x1f"))
     
+    @contextmanager
+    def transaction(self):
+        """
+        Group several store calls into one atomic transaction.
+
+        Useful for read-modify-write sequences (e.g. updating a
+        profile): the write lock is held across the block and the
+        commit fsync is paid once at the end.
+        """
+        with self._write_lock:
+            cursor = self._conn().cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+
     def put(
         self, 
         namespace: Tuple[str, ...], 
@@ -105,21 +283,19 @@ class SQLiteStore:
             value: Dictionary to store
             metadata: Optional metadata dictionary
         """
-        with self.lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+        with self._write_lock:
+            cursor = self._conn().cursor()
             
             namespace_str = self._namespace_to_str(namespace)
-            value_str = json.dumps(value)
-            metadata_str = json.dumps(metadata) if metadata else None
+            value_str = _dumps(value)
+            metadata_str = _dumps(metadata) if metadata else None
             
             # Generate embedding if index is configured
             embedding = None
             if self.index and "embed" in self.index:
                 try:
-                    # Create text representation for embedding
-                    text_content = json.dumps(value)
-                    embedding_bytes = self.index["embed"]([text_content])[0]
+                    # Reuse the serialized value as the embedding text
+                    embedding_bytes = self.index["embed"]([value_str])[0]
                     # Convert to bytes if needed
                     if isinstance(embedding_bytes, list):
                         import struct
@@ -135,16 +311,84 @@ class SQLiteStore:
                 VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
             """, (namespace_str, key, value_str, embedding, metadata_str))
             
-            # Update FTS index
-            row_id = cursor.lastrowid
-            cursor.execute("""
-                INSERT OR REPLACE INTO store_fts(rowid, namespace, key, value)
-                VALUES (?, ?, ?, ?)
-            """, (row_id, namespace_str, key, value_str))
-            
-            conn.commit()
-            conn.close()
+            # Mirror the embedding into the vector table (FTS syncs
+            # itself via triggers)
+            if embedding is not None and self._vec_enabled():
+                cursor.execute("""
+                    INSERT OR REPLACE INTO vec_store(rowid, embedding)
+                    VALUES (?, ?)
+                """, (cursor.lastrowid, embedding))
     
+    def touch(self, namespace: Tuple[str, ...], key: str) -> bool:
+        """
+        Bump a row's updated_at without rewriting its JSON value.
+
+        Lets callers record "seen again" on a large document (e.g. a
+        contact profile) at O(1) cost instead of re-encoding the whole
+        dict; returns False when the row does not exist yet.
+        """
+        with self._write_lock:
+            cursor = self._conn().cursor()
+            cursor.execute("""
+                UPDATE store SET updated_at = CURRENT_TIMESTAMP
+                WHERE namespace = ? AND key = ?
+            """, (self._namespace_to_str(namespace), key))
+            return cursor.rowcount > 0
+
+    def put_many(
+        self,
+        entries: List[Tuple[Tuple[str, ...], str, Dict[str, Any], Optional[Dict[str, Any]]]]
+    ):
+        """
+        Store many values inside a single transaction.
+
+        Each entry is (namespace, key, value, metadata). The commit
+        fsync is paid once for the whole batch instead of per value,
+        and embeddings (when configured) are generated with one batched
+        embed call - useful when hydrating memories on bot restart.
+        """
+        if not entries:
+            return
+
+        rows = []
+        texts = []
+        for namespace, key, value, metadata in entries:
+            value_str = _dumps(value)
+            texts.append(value_str)
+            rows.append([
+                self._namespace_to_str(namespace),
+                key,
+                value_str,
+                None,
+                _dumps(metadata) if metadata else None
+            ])
+
+        # one batched embedding call instead of one per entry
+        if self.index and "embed" in self.index:
+            try:
+                import struct
+                embeddings = self.index["embed"](texts)
+                for row, embedding in zip(rows, embeddings):
+                    if isinstance(embedding, list):
+                        embedding = struct.pack(f'{len(embedding)}f', *embedding)
+                    row[3] = embedding
+            except Exception as e:
+                print(f"Warning: Embedding generation failed: {e}")
+
+        with self._write_lock:
+            cursor = self._conn().cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.executemany("""
+                    INSERT OR REPLACE INTO store
+                    (namespace, key, value, embedding, metadata, updated_at)
+                    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """, [tuple(row) for row in rows])
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+
     def get(self, namespace: Tuple[str, ...], key: str) -> Optional[StoreValue]:
         """
         Retrieve a value from the store.
@@ -156,25 +400,22 @@ class SQLiteStore:
         Returns:
             StoreValue with value and metadata, or None if not found
         """
-        with self.lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            namespace_str = self._namespace_to_str(namespace)
-            
-            cursor.execute("""
-                SELECT value, metadata FROM store
-                WHERE namespace = ? AND key = ?
-            """, (namespace_str, key))
-            
-            row = cursor.fetchone()
-            conn.close()
-            
-            if row:
-                value = json.loads(row[0])
-                metadata = json.loads(row[1]) if row[1] else None
-                return StoreValue(value=value, metadata=metadata)
-            return None
+        cursor = self._conn().cursor()
+
+        namespace_str = self._namespace_to_str(namespace)
+
+        cursor.execute("""
+            SELECT value, metadata FROM store
+            WHERE namespace = ? AND key = ?
+        """, (namespace_str, key))
+
+        row = cursor.fetchone()
+
+        if row:
+            value = _loads(row[0])
+            metadata = _loads(row[1]) if row[1] else None
+            return StoreValue(value=value, metadata=metadata)
+        return None
     
     def search(
         self,
@@ -195,102 +436,250 @@ class SQLiteStore:
         Returns:
             List of StoreValue objects, sorted by relevance
         """
-        with self.lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            namespace_str = self._namespace_to_str(namespace)
-            results = []
-            
-            if query:
-                # Use FTS5 for text search
-                cursor.execute("""
-                    SELECT s.value, s.metadata, 
-                           rank AS rank
-                    FROM store s
-                    JOIN store_fts fts ON s.id = fts.rowid
-                    WHERE fts.namespace = ?
-                    AND store_fts MATCH ?
-                    ORDER BY rank
-                    LIMIT ?
-                """, (namespace_str, query, limit))
+        cursor = self._conn().cursor()
+
+        namespace_str = self._namespace_to_str(namespace)
+        results = []
+
+        # scalar filters are pushed into SQL via json_extract so rows
+        # that would be discarded are never transferred or JSON-decoded;
+        # non-scalar values fall back to the Python check below. The
+        # JSON path is bound as a parameter, never interpolated - a key
+        # containing a quote would otherwise break out of the statement.
+        # The SQL text only varies with the filter count, so sqlite3's
+        # per-connection statement cache reuses the compiled plan.
+        sql_filter = ""
+        sql_filter_params = []
+        python_filter = {}
+        if filter:
+            fragments = []
+            for filter_key, filter_value in filter.items():
+                if isinstance(filter_value, (str, int, float, bool)):
+                    fragments.append("json_extract(s.value, ?) = ?")
+                    sql_filter_params.append(f"$.{filter_key}")
+                    sql_filter_params.append(filter_value)
+                else:
+                    python_filter[filter_key] = filter_value
+            if fragments:
+                sql_filter = " AND " + " AND ".join(fragments)
+
+        if query:
+            # Use FTS5 for text search
+            cursor.execute(f"""
+                SELECT s.value, s.metadata
+                FROM store s
+                JOIN store_fts fts ON s.id = fts.rowid
+                WHERE fts.namespace = ?
+                AND store_fts MATCH ?{sql_filter}
+                ORDER BY rank
+                LIMIT ?
+            """, (namespace_str, query, *sql_filter_params, limit))
+        else:
+            # No query - get all items in namespace
+            cursor.execute(f"""
+                SELECT s.value, s.metadata FROM store s
+                WHERE s.namespace = ?{sql_filter}
+                LIMIT ?
+            """, (namespace_str, *sql_filter_params, limit))
+
+        for row in cursor.fetchmany(limit):
+            value = _loads(row[0])
+            metadata = _loads(row[1]) if row[1] else None
+
+            # Check any filters SQL could not express
+            if python_filter:
+                matches = True
+                for filter_key, filter_value in python_filter.items():
+                    if filter_key not in value or value[filter_key] != filter_value:
+                        matches = False
+                        break
+                if not matches:
+                    continue
+
+            results.append(StoreValue(value=value, metadata=metadata))
+
+        return results
+
+    def search_memories(
+        self,
+        namespace: Tuple[str, ...],
+        limit: int = 10
+    ) -> List[StoreValue]:
+        """
+        Fetch the top memories of a namespace ordered by importance.
+
+        The memory_ key filter, the ORDER BY and the LIMIT all run
+        inside SQLite, so only the rows actually returned are
+        transferred and JSON-decoded.
+        """
+        cursor = self._conn().cursor()
+
+        cursor.execute("""
+            SELECT value, metadata FROM store
+            WHERE namespace = ? AND key LIKE 'memory_%'
+            ORDER BY json_extract(value, '$.importance') DESC
+            LIMIT ?
+        """, (self._namespace_to_str(namespace), limit))
+
+        return [
+            StoreValue(
+                value=_loads(row[0]),
+                metadata=_loads(row[1]) if row[1] else None
+            )
+            for row in cursor.fetchall()
+        ]
+
+    def fetch_context(
+        self,
+        namespace: Tuple[str, ...],
+        mem_limit: int = 5
+    ) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Fetch a namespace's profile and its top memories in one query.
+
+        Returns (profile_or_None, memories ordered by importance).
+        Profile and memories live in the same namespace, so one
+        statement with a CASE ordering replaces the separate profile
+        get and memory search round-trips.
+        """
+        cursor = self._conn().cursor()
+
+        cursor.execute("""
+            SELECT key, value FROM store
+            WHERE namespace = ? AND (key = 'profile' OR key LIKE 'memory_%')
+            ORDER BY CASE WHEN key = 'profile' THEN 0 ELSE 1 END,
+                     json_extract(value, '$.importance') DESC
+            LIMIT ?
+        """, (self._namespace_to_str(namespace), mem_limit + 1))
+
+        profile = None
+        memories = []
+        for key, value_str in cursor.fetchall():
+            if key == "profile":
+                profile = _loads(value_str)
             else:
-                # No query - get all items in namespace
-                cursor.execute("""
-                    SELECT value, metadata FROM store
-                    WHERE namespace = ?
-                    LIMIT ?
-                """, (namespace_str, limit))
-            
-            rows = cursor.fetchall()
-            
-            # Apply filter if provided
-            for row in rows:
-                value = json.loads(row[0])
-                metadata = json.loads(row[1]) if row[1] else None
-                
-                # Check filter matches
-                if filter:
-                    matches = True
-                    for filter_key, filter_value in filter.items():
-                        if filter_key not in value or value[filter_key] != filter_value:
-                            matches = False
-                            break
-                    if not matches:
-                        continue
-                
-                results.append(StoreValue(value=value, metadata=metadata))
-            
-            conn.close()
-            return results
-    
+                memories.append(_loads(value_str))
+        # without a profile row the LIMIT admits one extra memory
+        return profile, memories[:mem_limit]
+
+    def search_prefix(
+        self,
+        prefix: Tuple[str, ...],
+        limit: int = 100
+    ) -> List[StoreValue]:
+        """
+        Fetch values from every namespace nested under the given prefix
+        (e.g. ("whatsapp", "user") covers all user chats). Runs as a
+        pure B-tree range scan on the namespace index.
+        """
+        cursor = self._conn().cursor()
+        prefix_str = self._namespace_to_str(prefix)
+
+        # "\x1f" < "\x20" bounds the range to namespaces that extend
+        # the prefix by at least one more component
+        cursor.execute("""
+            SELECT value, metadata FROM store
+            WHERE namespace >= ? AND namespace < ?
+            LIMIT ?
+        """, (prefix_str + "\x1f", prefix_str + "\x20", limit))
+
+        return [
+            StoreValue(
+                value=_loads(row[0]),
+                metadata=_loads(row[1]) if row[1] else None
+            )
+            for row in cursor.fetchall()
+        ]
+
+    def search_vec(
+        self,
+        namespace: Tuple[str, ...],
+        query_embedding,
+        k: int = 10
+    ) -> List[StoreValue]:
+        """
+        Nearest-neighbor search over stored embeddings.
+
+        Uses the sqlite-vec virtual table when the extension is loaded,
+        so the scan runs in SIMD C code; otherwise falls back to
+        scoring the stored embedding BLOBs in Python.
+        """
+        cursor = self._conn().cursor()
+        namespace_str = self._namespace_to_str(namespace)
+        query_blob = self._pack_embedding(query_embedding)
+
+        if self._vec_enabled():
+            cursor.execute("""
+                SELECT s.value, s.metadata
+                FROM vec_store v
+                JOIN store s ON s.id = v.rowid
+                WHERE v.embedding MATCH ? AND k = ? AND s.namespace = ?
+            """, (query_blob, k, namespace_str))
+            return [
+                StoreValue(
+                    value=_loads(row[0]),
+                    metadata=_loads(row[1]) if row[1] else None
+                )
+                for row in cursor.fetchall()
+            ]
+
+        # Fallback: cosine-score in Python over this namespace only
+        query_vec = struct.unpack(f'{len(query_blob) // 4}f', query_blob)
+        query_norm = sum(x * x for x in query_vec) ** 0.5 or 1.0
+        cursor.execute("""
+            SELECT value, metadata, embedding FROM store
+            WHERE namespace = ? AND embedding IS NOT NULL
+        """, (namespace_str,))
+
+        scored = []
+        for value_str, metadata_str, embedding_blob in cursor.fetchall():
+            vec = struct.unpack(f'{len(embedding_blob) // 4}f', embedding_blob)
+            norm = sum(x * x for x in vec) ** 0.5 or 1.0
+            score = sum(a * b for a, b in zip(query_vec, vec)) / (query_norm * norm)
+            scored.append((score, value_str, metadata_str))
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [
+            StoreValue(
+                value=_loads(value_str),
+                metadata=_loads(metadata_str) if metadata_str else None
+            )
+            for _, value_str, metadata_str in scored[:k]
+        ]
+
     def delete(self, namespace: Tuple[str, ...], key: str):
         """Delete a value from the store"""
-        with self.lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
+        with self._write_lock:
+            cursor = self._conn().cursor()
+
             namespace_str = self._namespace_to_str(namespace)
-            
+
             cursor.execute("""
                 DELETE FROM store
                 WHERE namespace = ? AND key = ?
             """, (namespace_str, key))
-            
-            conn.commit()
-            conn.close()
     
     def list_namespaces(self) -> List[Tuple[str, ...]]:
         """List all unique namespaces in the store"""
-        with self.lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT DISTINCT namespace FROM store")
-            rows = cursor.fetchall()
-            
-            namespaces = [self._str_to_namespace(row[0]) for row in rows]
-            conn.close()
-            
-            return namespaces
+        cursor = self._conn().cursor()
+
+        cursor.execute("SELECT DISTINCT namespace FROM store")
+        rows = cursor.fetchall()
+
+        return [self._str_to_namespace(row[0]) for row in rows]
     
     def list_keys(self, namespace: Tuple[str, ...]) -> List[str]:
         """List all keys in a namespace"""
-        with self.lock:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            namespace_str = self._namespace_to_str(namespace)
-            
-            cursor.execute("""
-                SELECT key FROM store
-                WHERE namespace = ?
-            """, (namespace_str,))
-            
-            keys = [row[0] for row in cursor.fetchall()]
-            conn.close()
-            
-            return keys
+        cursor = self._conn().cursor()
+
+        namespace_str = self._namespace_to_str(namespace)
+
+        cursor.execute("""
+            SELECT key FROM store
+            WHERE namespace = ?
+        """, (namespace_str,))
+
+        return [row[0] for row in cursor.fetchall()]
 
 
 def create_whatsapp_namespace(contact_name: str, is_group: bool = False) -> Tuple[str, ...]:
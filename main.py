@@ -1,9 +1,13 @@
-import traceback
+import asyncio
+import queue
 import time
+import traceback
 import pprint
+from concurrent.futures import ThreadPoolExecutor
 from whatsapp import WhatsappDriver
 from ai_llm import LanguageModel
 from dotenv import load_dotenv
+from message_batcher import MessageBatcher
 from utils import is_prompt_message
 
 # load env vars and initialize in general
@@ -18,46 +22,145 @@ operation_type = input("Enter chat operation type (single or multiple): ")
 # initialize for single chat window
 if operation_type.lower() == "single":
     target_chat = input("Enter target chat name (case sensitive): ")
-    last_msg = ""
     driver.open_chat_window(target_chat)
     driver.send_message(start_message)
 
-    while True:
-        try:
-            latest_msg, img_url, contact = driver.get_latest_message_and_contact()
-            if latest_msg and latest_msg != last_msg:
-                print(f"New message received from {contact}: {latest_msg}")
-                if img_url:
-                    print(f"With img: {img_url}")
-                    img_base64 = driver.get_image_base64(img_url)
-                else:
-                    img_base64 = ""
-                if is_prompt_message(latest_msg):
-                    # check contact who sent message, check or make
-                    # msg history, get prompt and generate response
-                    ai_messages = language_model.get_llm_response(
-                        text=f"{contact} said: {latest_msg}",
-                        session_id=target_chat,
-                        img_base64=img_base64,
-                        contact_name=contact
+    # Selenium is not thread-safe, so every driver call goes through
+    # this single-thread executor while LLM round-trips overlap freely
+    # on the event loop
+    driver_executor = ThreadPoolExecutor(max_workers=1)
+
+    async def single_chat_main():
+        loop = asyncio.get_running_loop()
+        prompt_queue = asyncio.Queue()
+        # cap concurrent LLM calls to match provider limits
+        llm_semaphore = asyncio.Semaphore(8)
+        last_msg = ""
+        # replies enqueued but not yet sent; while non-zero the poller
+        # must not park in the long browser wait, because that blocking
+        # call would queue ahead of the send on the single driver thread
+        pending_replies = 0
+
+        async def poller():
+            # reads messages and enqueues prompts; never blocks on the
+            # LLM, so new messages keep flowing in during inference
+            nonlocal last_msg, pending_replies
+            seen_state = None
+            while True:
+                try:
+                    latest_msg, img_url, contact = await loop.run_in_executor(
+                        driver_executor, driver.get_latest_message_and_contact
                     )
-                    for ai_message in ai_messages:
-                        driver.send_message(message=ai_message)
-            last_msg = latest_msg
-        except Exception:
-            traceback.print_exc()
-        time.sleep(1)
+                    if latest_msg and latest_msg != last_msg:
+                        print(f"New message received from {contact}: {latest_msg}")
+                        # only fetch the image once we know the message
+                        # is actually going to the LLM
+                        if is_prompt_message(latest_msg):
+                            if img_url:
+                                print(f"With img: {img_url}")
+                                img_base64 = await loop.run_in_executor(
+                                    driver_executor, driver.get_image_base64, img_url
+                                )
+                            else:
+                                img_base64 = ""
+                            pending_replies += 1
+                            await prompt_queue.put((latest_msg, img_base64, contact))
+                    last_msg = latest_msg
+                except Exception:
+                    traceback.print_exc()
+                # block in the browser until a new incoming message node
+                # appears instead of re-querying the DOM every second;
+                # passing the state token back makes messages that
+                # landed during processing resolve the wait immediately.
+                # While replies are still in flight, fall back to a
+                # short wait: the sender shares the driver thread, and a
+                # 60s wait submitted first would stall it for the full
+                # minute (our own outgoing reply never resolves it).
+                # Guarded separately - execute_async_script throws on a
+                # page re-render, and an unhandled raise here would end
+                # the poller and with it the whole gather
+                try:
+                    timeout = 1 if pending_replies else 60
+                    seen_state = await loop.run_in_executor(
+                        driver_executor, driver.wait_for_new_message, timeout, seen_state
+                    )
+                except Exception:
+                    traceback.print_exc()
+                    await asyncio.sleep(1)
+
+        # pipeline stage between inference and the driver: each entry is
+        # a queue of response pieces ending in a None sentinel
+        send_queue = asyncio.Queue()
+
+        async def worker():
+            # consumes prompts and streams inference into the send
+            # queue; handing the pieces off instead of awaiting the
+            # send lets inference for message N+1 start while the
+            # driver is still typing message N
+            while True:
+                latest_msg, img_base64, contact = await prompt_queue.get()
+                try:
+                    async with llm_semaphore:
+                        piece_queue = queue.Queue()
+                        await send_queue.put(piece_queue)
+                        try:
+                            async for piece in language_model.aget_llm_response_stream(
+                                text=f"{contact} said: {latest_msg}",
+                                session_id=target_chat,
+                                img_base64=img_base64,
+                                contact_name=contact
+                            ):
+                                piece_queue.put(piece)
+                        finally:
+                            piece_queue.put(None)
+                except Exception:
+                    traceback.print_exc()
+                finally:
+                    prompt_queue.task_done()
+
+        async def sender():
+            # drains replies one at a time on the driver thread so
+            # messages go out in order; the piece iterator blocks until
+            # the worker's None sentinel arrives
+            nonlocal pending_replies
+            while True:
+                piece_queue = await send_queue.get()
+                try:
+                    await loop.run_in_executor(
+                        driver_executor,
+                        driver.send_message_stream,
+                        iter(piece_queue.get, None)
+                    )
+                except Exception:
+                    traceback.print_exc()
+                finally:
+                    pending_replies -= 1
+                    send_queue.task_done()
+
+        await asyncio.gather(poller(), worker(), sender())
+
+    asyncio.run(single_chat_main())
 
 elif operation_type.lower() == "multiple":
     # initialize for multi chat windows
     last_msg_dict = {}
+    # prompts collected but not yet answered: last_msg_dict only
+    # advances once the reply is actually sent, so a transient LLM
+    # failure (abatch_responses logs and skips it) or a failed send
+    # leaves the message eligible for retry on the next pass instead
+    # of dropping it forever
+    pending_msgs = {}
     pp = pprint.PrettyPrinter(indent=4)
+    batcher = MessageBatcher(language_model)
+    seen_state = None
 
     while True:
         try:
             # get all unread contacts
             unread_contacts = driver.get_unread_contacts()
             if unread_contacts:
+                # first pass: collect all new prompts without waiting
+                # on the LLM between contacts
                 for unread_contact in unread_contacts:
                     # open chat window of contact, get latest msg
                     driver.open_chat_window(unread_contact)
@@ -68,23 +171,51 @@ elif operation_type.lower() == "multiple":
                     latest_msg_from_contact = contact + " said: " + latest_msg
                     if last_msg_dict[unread_contact] != latest_msg_from_contact:
                         print(f"New message received from {contact}: {latest_msg}")
-                        if img_url:
-                            print(f"With img: {img_url}")
-                            img_base64 = driver.get_image_base64(img_url)
-                        else:
-                            img_base64 = ""
-                        # check if latest msg is prompt msg
+                        # check if latest msg is prompt msg before paying
+                        # for the image fetch
                         if is_prompt_message(latest_msg):
-                            ai_message = language_model.get_llm_response(
-                                text=latest_msg_from_contact,
-                                session_id=unread_contact,
-                                img_base64=img_base64,
-                                contact_name=contact
-                            )
-                            driver.send_message(message=ai_message)
-                        last_msg_dict[unread_contact] = latest_msg_from_contact
+                            # only collect a message once per attempt;
+                            # bookkeeping moves after the send succeeds
+                            if pending_msgs.get(unread_contact) != latest_msg_from_contact:
+                                if img_url:
+                                    print(f"With img: {img_url}")
+                                    img_base64 = driver.get_image_base64(img_url)
+                                else:
+                                    img_base64 = ""
+                                batcher.collect(
+                                    session_id=unread_contact,
+                                    text=latest_msg_from_contact,
+                                    img_base64=img_base64,
+                                    contact_name=contact
+                                )
+                                pending_msgs[unread_contact] = latest_msg_from_contact
+                        else:
+                            pending_msgs.pop(unread_contact, None)
+                            last_msg_dict[unread_contact] = latest_msg_from_contact
+                    driver.close_chat_window()
+
+                # second pass: all LLM calls ran concurrently; send the
+                # replies from the driver's own thread
+                for reply_contact, ai_messages in batcher.flush():
+                    driver.open_chat_window(reply_contact)
+                    for ai_message in ai_messages:
+                        driver.send_message(message=ai_message)
                     driver.close_chat_window()
+                    # reply delivered: only now mark the message as
+                    # handled so earlier failures stay retryable
+                    if reply_contact in pending_msgs:
+                        last_msg_dict[reply_contact] = pending_msgs.pop(reply_contact)
             pp.pprint(last_msg_dict)
         except Exception:
             traceback.print_exc()
-        time.sleep(1)
+        # wait for a new message-in node or unread badge instead of the
+        # fixed 1s poll; the threaded state token resolves the wait at
+        # once when something arrived during the scan, and the timeout
+        # still recovers from any event the observer missed. Guarded so
+        # a page re-render aborting execute_async_script cannot kill
+        # the process
+        try:
+            seen_state = driver.wait_for_new_message(60, seen_state)
+        except Exception:
+            traceback.print_exc()
+            time.sleep(1)
@@ -3,6 +3,7 @@ Memory Manager for WhatsApp bot using LangGraph SQLite Store.
 Provides convenient methods for storing and retrieving contact personalities and memories.
 """
 from typing import Optional, Dict, Any, List
+from collections import OrderedDict
 from langgraph_memory import SQLiteStore, StoreValue, create_whatsapp_namespace
 from datetime import datetime, timezone
 
@@ -19,6 +20,29 @@ class MemoryManager:
         self.store = SQLiteStore(db_path=db_path)
         # AI's own namespace for self-awareness
         self.ai_namespace = ("whatsapp", "ai", "shorekeeper")
+        # bounded LRU over decoded profiles, keyed (namespace, key);
+        # profiles are read on every message but change only when an
+        # extraction pass writes them, so hits skip the SQLite get and
+        # the JSON decode entirely
+        self._profile_cache = OrderedDict()
+        self._profile_cache_limit = 256
+
+    def _cached_get(self, namespace: tuple, key: str) -> Optional[Dict[str, Any]]:
+        cache_key = (namespace, key)
+        cached = self._profile_cache.get(cache_key)
+        if cached is not None:
+            self._profile_cache.move_to_end(cache_key)
+            return cached
+        result = self.store.get(namespace, key)
+        if result is None:
+            return None
+        self._profile_cache[cache_key] = result.value
+        if len(self._profile_cache) > self._profile_cache_limit:
+            self._profile_cache.popitem(last=False)
+        return result.value
+
+    def _invalidate(self, namespace: tuple, key: str):
+        self._profile_cache.pop((namespace, key), None)
     
     def save_contact_profile(
         self,
@@ -39,39 +63,51 @@ class MemoryManager:
             metadata: Additional metadata
         """
         namespace = create_whatsapp_namespace(contact_name, is_group)
-        
-        # Get existing profile or create new one
-        existing = self.store.get(namespace, "profile")
-        profile = existing.value if existing else {}
-        
-        # Update profile
-        if personality_summary:
-            profile["personality_summary"] = personality_summary
-        if personality_traits:
-            if "personality_traits" in profile:
-                profile["personality_traits"].update(personality_traits)
-            else:
-                profile["personality_traits"] = personality_traits
-        if metadata:
-            if "metadata" in profile:
-                profile["metadata"].update(metadata)
-            else:
-                profile["metadata"] = metadata
-        
-        # Add/update timestamps
-        if "first_interaction" not in profile:
-            profile["first_interaction"] = datetime.now(timezone.utc).isoformat()
-        profile["last_interaction"] = datetime.now(timezone.utc).isoformat()
-        profile["is_group"] = is_group
-        
-        # Save to store
-        self.store.put(namespace, "profile", profile)
+
+        if not (personality_summary or personality_traits or metadata):
+            # only the interaction timestamp would change: bump the
+            # row's updated_at in place instead of re-encoding the
+            # whole (growing) profile JSON; fall through to the full
+            # write when the profile does not exist yet
+            if self.store.touch(namespace, "profile"):
+                return
+
+        # transaction so the read-modify-write is atomic against
+        # concurrent extraction threads updating the same profile
+        with self.store.transaction():
+            # Get existing profile or create new one
+            existing = self.store.get(namespace, "profile")
+            profile = existing.value if existing else {}
+
+            # Update profile
+            if personality_summary:
+                profile["personality_summary"] = personality_summary
+            if personality_traits:
+                if "personality_traits" in profile:
+                    profile["personality_traits"].update(personality_traits)
+                else:
+                    profile["personality_traits"] = personality_traits
+            if metadata:
+                if "metadata" in profile:
+                    profile["metadata"].update(metadata)
+                else:
+                    profile["metadata"] = metadata
+
+            # Add/update timestamps (one clock read per save)
+            now_iso = datetime.now(timezone.utc).isoformat()
+            if "first_interaction" not in profile:
+                profile["first_interaction"] = now_iso
+            profile["last_interaction"] = now_iso
+            profile["is_group"] = is_group
+
+            # Save to store
+            self.store.put(namespace, "profile", profile)
+        self._invalidate(namespace, "profile")
     
     def get_contact_profile(self, contact_name: str, is_group: bool = False) -> Optional[Dict[str, Any]]:
         """Get contact profile/personality"""
         namespace = create_whatsapp_namespace(contact_name, is_group)
-        result = self.store.get(namespace, "profile")
-        return result.value if result else None
+        return self._cached_get(namespace, "profile")
     
     def add_memory(
         self,
@@ -95,16 +131,17 @@ class MemoryManager:
         """
         namespace = create_whatsapp_namespace(contact_name, is_group)
         
-        # Create unique key with timestamp
-        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S_%f")
-        key = f"memory_{memory_type}_{timestamp}"
-        
+        # Create unique key with timestamp; one clock read serves both
+        # the key and the created_at field
+        now = datetime.now(timezone.utc)
+        key = f"memory_{memory_type}_{now.strftime('%Y%m%d_%H%M%S_%f')}"
+
         memory = {
             "content": content,
             "memory_type": memory_type,
             "importance": importance,
             "tags": tags or [],
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "created_at": now.isoformat()
         }
         
         self.store.put(namespace, key, memory)
@@ -129,18 +166,23 @@ class MemoryManager:
             List of memory dictionaries
         """
         namespace = create_whatsapp_namespace(contact_name, is_group)
-        
-        # Get all memories (they all start with "memory_")
-        all_results = self.store.search(namespace, query=query, limit=100)
-        
-        memories = []
-        for result in all_results:
-            if result.value.get("memory_type"):
-                memories.append(result.value)
-        
-        # Sort by importance and return top results
-        memories.sort(key=lambda m: m.get("importance", 0), reverse=True)
-        return memories[:limit]
+
+        if query:
+            # FTS path: rank by text relevance first, then importance
+            all_results = self.store.search(namespace, query=query, limit=100)
+            memories = [
+                result.value for result in all_results
+                if result.value.get("memory_type")
+            ]
+            memories.sort(key=lambda m: m.get("importance", 0), reverse=True)
+            return memories[:limit]
+
+        # no query: importance ordering and the limit run inside SQLite,
+        # so rows that would be discarded are never decoded
+        return [
+            result.value
+            for result in self.store.search_memories(namespace, limit=limit)
+        ]
     
     def get_contact_context(self, contact_name: str, is_group: bool = False) -> str:
         """
@@ -153,39 +195,33 @@ class MemoryManager:
         Returns:
             Formatted context string
         """
+        # profile and top memories come back from one store query
+        namespace = create_whatsapp_namespace(contact_name, is_group)
+        profile, memories = self.store.fetch_context(namespace, mem_limit=5)
+
         context_parts = []
-        
-        # Get profile
-        profile = self.get_contact_profile(contact_name, is_group)
         if profile:
-            context_parts.append(f"Contact: {contact_name}")
-            if profile.get("is_group"):
-                context_parts.append("Type: Group chat")
-            else:
-                context_parts.append("Type: Individual chat")
-            
-            if profile.get("personality_summary"):
+            context_parts = [
+                f"Contact: {contact_name}",
+                "Type: Group chat" if profile.get("is_group")
+                else "Type: Individual chat",
+            ]
+            if summary := profile.get("personality_summary"):
+                context_parts.append(f"Personality: {summary}")
+            if traits := profile.get("personality_traits"):
                 context_parts.append(
-                    f"Personality: {profile['personality_summary']}"
+                    "Traits: " + ", ".join(
+                        f"{k}: {v}" for k, v in traits.items()
+                    )
                 )
-            
-            traits = profile.get("personality_traits", {})
-            if traits:
-                traits_str = ", ".join([
-                    f"{k}: {v}" for k, v in traits.items()
-                ])
-                context_parts.append(f"Traits: {traits_str}")
-        
-        # Get relevant memories
-        memories = self.get_relevant_memories(
-            contact_name, is_group, limit=5
-        )
+
         if memories:
             context_parts.append("\nRelevant memories:")
-            for mem in memories:
-                context_parts.append(f"- {mem.get('content', '')}")
-        
-        return "\n".join(context_parts) if context_parts else ""
+            context_parts.extend(
+                f"- {mem.get('content', '')}" for mem in memories
+            )
+
+        return "\n".join(context_parts)
     
     def save_ai_personality(
         self,
@@ -204,41 +240,45 @@ class MemoryManager:
             self_observations: List of self-observations (e.g., "I tend to be more playful with this user")
             metadata: Additional metadata
         """
-        # Get existing AI profile or create new one
-        existing = self.store.get(self.ai_namespace, "self_profile")
-        profile = existing.value if existing else {}
-        
-        # Update profile
-        if personality_summary:
-            profile["personality_summary"] = personality_summary
-        if personality_traits:
-            if "personality_traits" in profile:
-                profile["personality_traits"].update(personality_traits)
-            else:
-                profile["personality_traits"] = personality_traits
-        if self_observations:
-            if "self_observations" in profile:
-                profile["self_observations"].extend(self_observations)
-            else:
-                profile["self_observations"] = self_observations
-        if metadata:
-            if "metadata" in profile:
-                profile["metadata"].update(metadata)
-            else:
-                profile["metadata"] = metadata
-        
-        # Add/update timestamps
-        if "first_awareness" not in profile:
-            profile["first_awareness"] = datetime.now(timezone.utc).isoformat()
-        profile["last_updated"] = datetime.now(timezone.utc).isoformat()
-        
-        # Save to store
-        self.store.put(self.ai_namespace, "self_profile", profile)
+        # transaction: every extraction thread writes this one row, so
+        # an unlocked read-modify-write here would drop updates
+        with self.store.transaction():
+            # Get existing AI profile or create new one
+            existing = self.store.get(self.ai_namespace, "self_profile")
+            profile = existing.value if existing else {}
+
+            # Update profile
+            if personality_summary:
+                profile["personality_summary"] = personality_summary
+            if personality_traits:
+                if "personality_traits" in profile:
+                    profile["personality_traits"].update(personality_traits)
+                else:
+                    profile["personality_traits"] = personality_traits
+            if self_observations:
+                if "self_observations" in profile:
+                    profile["self_observations"].extend(self_observations)
+                else:
+                    profile["self_observations"] = self_observations
+            if metadata:
+                if "metadata" in profile:
+                    profile["metadata"].update(metadata)
+                else:
+                    profile["metadata"] = metadata
+
+            # Add/update timestamps (one clock read per save)
+            now_iso = datetime.now(timezone.utc).isoformat()
+            if "first_awareness" not in profile:
+                profile["first_awareness"] = now_iso
+            profile["last_updated"] = now_iso
+
+            # Save to store
+            self.store.put(self.ai_namespace, "self_profile", profile)
+        self._invalidate(self.ai_namespace, "self_profile")
     
     def get_ai_personality(self) -> Optional[Dict[str, Any]]:
         """Get the AI's own personality profile"""
-        result = self.store.get(self.ai_namespace, "self_profile")
-        return result.value if result else None
+        return self._cached_get(self.ai_namespace, "self_profile")
     
     def add_ai_self_observation(
         self,
@@ -254,24 +294,35 @@ class MemoryManager:
         - "I prefer giving detailed technical explanations"
         - "I feel more comfortable with casual conversation styles"
         """
-        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S_%f")
-        key = f"self_observation_{timestamp}"
-        
+        now = datetime.now(timezone.utc)
+        key = f"self_observation_{now.strftime('%Y%m%d_%H%M%S_%f')}"
+
         observation_data = {
             "content": observation,
             "importance": importance,
             "tags": tags or [],
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "created_at": now.isoformat()
         }
         
-        self.store.put(self.ai_namespace, key, observation_data)
-        
-        # Also add to self_observations list in profile
-        profile = self.get_ai_personality() or {}
-        if "self_observations" not in profile:
-            profile["self_observations"] = []
-        profile["self_observations"].append(observation)
-        self.store.put(self.ai_namespace, "self_profile", profile)
+        # transaction keeps the profile read-modify-write atomic
+        # against the other extraction threads hitting the same row;
+        # reading the store directly (not the cache) inside the lock
+        # guarantees the merge starts from the committed state
+        with self.store.transaction():
+            self.store.put(self.ai_namespace, key, observation_data)
+
+            # Also add to self_observations list in profile, capped to
+            # the last 50 so the per-call JSON payload stays bounded;
+            # the self_observation_<ts> entries above keep the full
+            # log, and get_ai_self_context only reads the last 5 anyway
+            existing = self.store.get(self.ai_namespace, "self_profile")
+            profile = existing.value if existing else {}
+            observations = profile.setdefault("self_observations", [])
+            observations.append(observation)
+            if len(observations) > 50:
+                del observations[:-50]
+            self.store.put(self.ai_namespace, "self_profile", profile)
+        self._invalidate(self.ai_namespace, "self_profile")
     
     def get_ai_self_context(self) -> str:
         """
@@ -281,25 +332,18 @@ class MemoryManager:
         profile = self.get_ai_personality()
         if not profile:
             return ""
-        
+
         context_parts = []
-        
-        if profile.get("personality_summary"):
+        if summary := profile.get("personality_summary"):
+            context_parts.append(f"Your evolving personality: {summary}")
+        if traits := profile.get("personality_traits"):
             context_parts.append(
-                f"Your evolving personality: {profile['personality_summary']}"
+                "Your traits: " + ", ".join(
+                    f"{k}: {v}" for k, v in traits.items()
+                )
             )
-        
-        traits = profile.get("personality_traits", {})
-        if traits:
-            traits_str = ", ".join([
-                f"{k}: {v}" for k, v in traits.items()
-            ])
-            context_parts.append(f"Your traits: {traits_str}")
-        
-        observations = profile.get("self_observations", [])
-        if observations:
+        if observations := profile.get("self_observations"):
             context_parts.append("\nYour self-observations:")
-            for obs in observations[-5:]:  # Last 5 observations
-                context_parts.append(f"- {obs}")
-        
-        return "\n".join(context_parts) if context_parts else ""
+            context_parts.extend(f"- {obs}" for obs in observations[-5:])
+
+        return "\n".join(context_parts)
@@ -0,0 +1,59 @@
+"""
+Dynamic batcher for inbound WhatsApp messages.
+Collects messages from a scan pass and runs their LLM calls
+concurrently, so a burst of N messages costs roughly one LLM
+round-trip of latency instead of N.
+"""
+import asyncio
+import threading
+
+
+class MessageBatcher:
+    """
+    Accumulates (session, prompt) pairs and flushes them as one
+    concurrent batch through the language model's async client.
+
+    Selenium is not thread-safe, so replies are returned to the caller
+    for sending on the driver's own thread rather than dispatched from
+    a background worker.
+    """
+
+    def __init__(self, language_model, max_batch_size: int = 8):
+        self.language_model = language_model
+        self.max_batch_size = max_batch_size
+        self._pending = []
+        # one persistent event loop on a daemon thread: the shared
+        # async HTTP client pins its keep-alive connections to the loop
+        # they were opened under, so running each flush in a fresh
+        # asyncio.run() loop would hand flush N+1 connections belonging
+        # to flush N's closed loop
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(
+            target=self._loop.run_forever, daemon=True
+        )
+        self._loop_thread.start()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def collect(self, session_id: str, text: str, img_base64: str = "", contact_name: str = None):
+        """Queue one inbound message for the next flush"""
+        self._pending.append((session_id, text, img_base64, contact_name))
+
+    def should_flush(self) -> bool:
+        return len(self._pending) >= self.max_batch_size
+
+    def flush(self):
+        """
+        Run all pending prompts concurrently and return
+        [(session_id, ai_messages)] in collect order. Failed items are
+        logged and skipped so one bad message cannot sink the batch.
+        """
+        if not self._pending:
+            return []
+
+        batch = self._pending
+        self._pending = []
+        return asyncio.run_coroutine_threadsafe(
+            self.language_model.abatch_responses(batch), self._loop
+        ).result()
@@ -1,20 +1,77 @@
+import base64
+import itertools
+import os
 import random
+import re
+
+# matches anything outside the Basic Multilingual Plane (emojis etc.);
+# compiled once so the per-message filter runs in the C regex engine
+_NON_BMP_RE = re.compile("[^\\u0000-\\uffff]")
+
+# anchored, case-insensitive prompt detector built around BOT_NAME so
+# other personas can run from the same code; compiled lazily because
+# the name comes from .env, which main.py only loads after imports
+_PROMPT_RE = None
+
+
+def _get_prompt_re():
+    global _PROMPT_RE
+    if _PROMPT_RE is None:
+        bot_name = os.getenv("BOT_NAME", "shorekeeper")
+        _PROMPT_RE = re.compile(
+            rf"^(?:hey|hi|hello)\s+{re.escape(bot_name)}\b", re.IGNORECASE
+        )
+    return _PROMPT_RE
+
+try:
+    # SIMD-accelerated base64 (~9x encode throughput); optional, the
+    # stdlib is used when it is not installed
+    import pybase64 as _b64
+except ImportError:
+    # stdlib base64 delegates to binascii's C loop, which is the best
+    # portable fallback; a hand-rolled SWAR kernel would need a
+    # compiler on the host and does not beat binascii from Python
+    _b64 = base64
+
+# single entry points so callers never care which backend is active
+fast_b64encode = _b64.b64encode
+fast_b64decode = _b64.b64decode
+
+
+def encode_image(image_bytes: bytes) -> str:
+    # base64 for LLM image payloads (data URLs get big fast)
+    return fast_b64encode(image_bytes).decode("ascii")
+
+
+def decode_image(img_base64: str) -> bytes:
+    return fast_b64decode(img_base64, validate=True)
+
+
+# jitter ring precomputed at import: same 1-3s distribution as
+# random.uniform but each call is just an iterator step, with no RNG
+# state mutation on the hot path
+_JITTER = [1 + 2 * random.random() for _ in range(1024)]
+_JITTER_CYCLE = itertools.cycle(_JITTER)
 
 
 def randomize_wait() -> float:
-    # change wait seconds here
-    return random.uniform(1, 3)
+    # change wait seconds in _JITTER above
+    return next(_JITTER_CYCLE)
 
 
-def is_prompt_message(message: str) -> bool:
-    prompts = ["hey shorekeeper", "hi shorekeeper", "hello shorekeeper"]
-    for prompt in prompts:
-        if message.lower().startswith(prompt):
-            return True
+def strip_prompt_trigger(message: str) -> str:
+    # drop the leading "hey <bot>" greeting (and trailing punctuation)
+    # so callers can look at the user's actual request
+    stripped = _get_prompt_re().sub("", message, count=1)
+    return stripped.lstrip(" \t,.!?:;-")
+
 
-    return False
+def is_prompt_message(message: str) -> bool:
+    # .match() checks only the head of the message instead of
+    # lowercasing the whole text first
+    return _get_prompt_re().match(message) is not None
 
 
 def filter_bmp_characters(text: str) -> str:
     # Filter out non BMP characters (emojis etc.)
-    return ''.join(char for char in text if ord(char) <= 0xFFFF)
+    return _NON_BMP_RE.sub('', text)
@@ -1,75 +1,179 @@
-import time
+import re
+
 from selenium import webdriver
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.common.exceptions import TimeoutException
-from utils import randomize_wait
+
+# pulls the sender name out of data-pre-plain-text ("[time] Name:")
+# in one C-level pass instead of two split() chains per poll tick
+_CONTACT_RE = re.compile(r"\]\s+([^:]+):")
+
+# Installed once per session (and re-installed after a page reload):
+# the fetch/FileReader closure lives in page context so repeated image
+# grabs reuse the same JIT-compiled helper instead of re-evaluating an
+# inline script body every call.
+_FETCH_IMAGE_HELPER_JS = """
+    window.__fetchImageB64 = function(uri, callback) {
+        fetch(uri)
+            .then(function(resp) {
+                if (!resp.ok) throw resp.status;
+                return resp.blob();
+            })
+            .then(function(blob) {
+                var reader = new FileReader();
+                reader.onloadend = function() {
+                    callback(reader.result.split(',')[1]);
+                };
+                reader.readAsDataURL(blob);
+            })
+            .catch(function(err) { callback({error: String(err)}); });
+    };
+"""
+
+# One DOM walk in the browser instead of several find_elements +
+# attribute round-trips: returns the latest incoming message, its image
+# src when one is attached, and the raw data-pre-plain-text header in a
+# single wire call.
+_LATEST_MESSAGE_JS = """
+    var result = {message: '', img_url: '', contact: ''};
+    var nodes = document.querySelectorAll(
+        'div.message-in span[data-testid="selectable-text"]');
+    if (!nodes.length) return result;
+    result.message = nodes[nodes.length - 1].innerText;
+    var imgs = document.querySelectorAll('div.message-in img.x15kfjtz');
+    if (imgs.length) {
+        var img = imgs[imgs.length - 1];
+        if (img.alt === result.message) result.img_url = img.src;
+    }
+    var headers = document.querySelectorAll(
+        'div.message-in div.copyable-text');
+    if (headers.length) {
+        result.contact = headers[headers.length - 1]
+            .getAttribute('data-pre-plain-text') || '';
+    }
+    return result;
+"""
+
+# Resolves as soon as the chat pane gains a new incoming message node
+# (or the chat list gains an unread badge, which is what a new message
+# looks like when no chat is open), or on timeout. The observer only
+# exists while the wait is in flight, so messages arriving while the
+# caller was busy would be invisible to a fresh observer: the caller
+# passes back the state token from its previous wait, and the script
+# resolves immediately when the current state no longer matches.
+# Installed per wait via execute_async_script; CDP push bindings would
+# avoid even that, but selenium's sync API has no way to consume CDP
+# events outside a dedicated bidi loop.
+_WAIT_NEW_MESSAGE_JS = """
+    var seenState = arguments[0];
+    var timeoutMs = arguments[1];
+    var callback = arguments[arguments.length - 1];
+    var currentState = function() {
+        return JSON.stringify([
+            document.querySelectorAll('div.message-in').length,
+            document.querySelectorAll(
+                'span[aria-label*="unread message"]').length
+        ]);
+    };
+    if (seenState !== null && currentState() !== seenState) {
+        callback(currentState());
+        return;
+    }
+    var container = document.querySelector('#main')
+        || document.querySelector('div[role="application"]')
+        || document.body;
+    var selector = 'div.message-in, span[aria-label*="unread message"]';
+    var timer = null;
+    var observer = new MutationObserver(function(mutations) {
+        for (var i = 0; i < mutations.length; i++) {
+            var added = mutations[i].addedNodes;
+            for (var j = 0; j < added.length; j++) {
+                var node = added[j];
+                if (node.nodeType !== 1) continue;
+                if (node.matches(selector)
+                        || node.querySelector(selector)) {
+                    observer.disconnect();
+                    clearTimeout(timer);
+                    callback(currentState());
+                    return;
+                }
+            }
+        }
+    });
+    timer = setTimeout(function() {
+        observer.disconnect();
+        callback(currentState());
+    }, timeoutMs);
+    observer.observe(container, {childList: true, subtree: true});
+"""
 
 
 class WhatsappDriver:
+    # locators built once; every poll tick reuses these instead of
+    # allocating fresh (By, selector) tuples
+    _LOGIN_SEL = (By.CSS_SELECTOR, 'div[data-tab="3"]')
+    _SEARCH_BOX_SEL = (By.CSS_SELECTOR, 'div[contenteditable="true"]')
+    _CANCEL_SEARCH_SEL = (By.CSS_SELECTOR, 'button[aria-label*="Cancel search"]')
+    _MENU_BUTTON_SEL = (By.CSS_SELECTOR, 'button[type="button"][aria-label="Menu"]')
+    _CLOSE_CHAT_SEL = (By.XPATH, "//*[contains(text(),'Close chat')]")
+    _UNREAD_BADGE_SEL = (By.CSS_SELECTOR, 'div._ahlk span[aria-label*="unread message"]')
+    _MESSAGE_BOX_SEL = (By.CSS_SELECTOR, 'div[contenteditable="true"][data-tab="10"]')
+
     def __init__(self) -> None:
         chrome_options = webdriver.ChromeOptions()
         chrome_options.add_argument("--disable-gpu")
         # chrome_options.add_argument("--headless=new")
         # chrome_options.add_argument("--window-size=1920,1080")
         self.driver = webdriver.Chrome(options=chrome_options)
+        # reusable waits; WebDriverWait is stateless between until()
+        # calls, so two shared instances cover all call sites
+        self._wait10 = WebDriverWait(self.driver, 10)
+        self._wait60 = WebDriverWait(self.driver, 60)
 
     def start_webdriver_and_login(self):
         self.driver.get('https://web.whatsapp.com')
         print("Please scan the QR code to login.")
-        WebDriverWait(self.driver, 60).until(
-            EC.presence_of_element_located((
-                By.CSS_SELECTOR, 'div[data-tab="3"]'
-            ))
-        )
+        self._wait60.until(EC.presence_of_element_located(self._LOGIN_SEL))
+        self.driver.execute_script(_FETCH_IMAGE_HELPER_JS)
         print("Logged in successfully")
 
     def open_chat_window(self, contact):
-        # Search contact
+        # Search contact; gate each step on the DOM being ready instead
+        # of blind randomized sleeps, so the chat opens as soon as the
+        # UI allows rather than seconds later
         print(f"Getting contact: {contact}")
-        time.sleep(randomize_wait())
-        search_box = self.driver.find_element(
-            By.CSS_SELECTOR,
-            'div[contenteditable="true"]'
+        search_box = self._wait10.until(
+            EC.element_to_be_clickable(self._SEARCH_BOX_SEL)
         )
         search_box.click()
-        time.sleep(randomize_wait())
         # This should open message window immediately
         search_box.send_keys(contact)
         search_box.send_keys(Keys.ENTER)
-        # Now to clear search box for next search
-        time.sleep(randomize_wait())
-        cancel_search_button = self.driver.find_element(
-            By.CSS_SELECTOR,
-            'button[aria-label*="Cancel search"]'
+        # the cancel button only renders once the search has applied,
+        # so waiting for it doubles as the "search done" condition
+        cancel_search_button = self._wait10.until(
+            EC.element_to_be_clickable(self._CANCEL_SEARCH_SEL)
         )
         cancel_search_button.click()
 
     def close_chat_window(self):
-        menu_button = self.driver.find_elements(By.CSS_SELECTOR, 'button[type="button"][aria-label="Menu"]')[-1]
+        menu_button = self.driver.find_elements(*self._MENU_BUTTON_SEL)[-1]
         menu_button.click()
-        WebDriverWait(self.driver, 10).until(
-            EC.presence_of_element_located((
-                By.XPATH, "//*[contains(text(),'Close chat')]"
-            ))
-        )
-        close_chat_button = self.driver.find_element(By.XPATH, "//*[contains(text(),'Close chat')]")
+        self._wait10.until(EC.presence_of_element_located(self._CLOSE_CHAT_SEL))
+        close_chat_button = self.driver.find_element(*self._CLOSE_CHAT_SEL)
         close_chat_button.click()
 
     def get_unread_contacts(self):
         unread_contacts = []
         try:
             # Locate the elements that indicate unread messages
-            WebDriverWait(self.driver, 60).until(
-                EC.presence_of_element_located((
-                    By.CSS_SELECTOR, 'div._ahlk span[aria-label*="unread message"]'
-                ))
-            )
-            unread_elements = self.driver.find_elements(
-                By.CSS_SELECTOR, 'div._ahlk span[aria-label*="unread message"]'
+            self._wait60.until(
+                EC.presence_of_element_located(self._UNREAD_BADGE_SEL)
             )
+            unread_elements = self.driver.find_elements(*self._UNREAD_BADGE_SEL)
             for element in unread_elements:
                 # Navigate to the contact's parent element to 
                 # get the contact name or other info
@@ -85,85 +189,88 @@ class WhatsappDriver:
 
         return unread_contacts
 
+    def wait_for_new_message(self, timeout=60, seen_state=None):
+        # event-driven replacement for fixed-interval polling: blocks in
+        # the browser until a new incoming message node appears instead
+        # of issuing DOM queries every second. Returns an opaque state
+        # token; pass it back on the next call so anything that arrived
+        # in between resolves that wait immediately.
+        self.driver.set_script_timeout(timeout + 5)
+        return self.driver.execute_async_script(
+            _WAIT_NEW_MESSAGE_JS, seen_state, int(timeout * 1000)
+        )
+
     def get_latest_message_and_contact(self):
-        message = ""
-        contact = ""
-        img_url = ""
         print("Getting latest message and contact")
 
-        # get all messages and take last sent message
-        messages = self.driver.find_elements(
-            By.CSS_SELECTOR, 'div.message-in span[data-testid="selectable-text"]'
-        )
-        if messages:
-            message = messages[-1].text
+        # one script call replaces the message/image/contact
+        # find_elements round-trips; the browser walks the DOM natively
+        # and ships back a single dict
+        result = self.driver.execute_script(_LATEST_MESSAGE_JS)
+        message = result["message"]
+        img_url = result["img_url"]
+        contact = result["contact"]
+        if message:
             print(f"Latest message: {message}")
-            sent_img = self.driver.find_elements(
-                By.CSS_SELECTOR, 'div.message-in img.x15kfjtz'
-            )
-            if sent_img:
-                sent_img = sent_img[-1]
-                if sent_img.get_attribute("alt") == message:
-                    img_url = sent_img.get_attribute('src')
-                    print(f"With img: {img_url}")
-
-        # get all contacts and take last contact
-        contacts = self.driver.find_elements(
-            By.CSS_SELECTOR, 'div.message-in div.copyable-text'
-        )
-        if contacts:
-            contact = contacts[-1].get_attribute(
-                'data-pre-plain-text'
-            )
-            contact = contact.split("] ")[-1].split(":")[0]
+        if img_url:
+            print(f"With img: {img_url}")
+        if contact:
+            match = _CONTACT_RE.search(contact)
+            contact = match.group(1) if match else ""
             print(f"Sent from contact: {contact}")
         return message, img_url, contact
 
     def send_message(self, message):
         print(f"Sending message: {message}")
-        message_box = WebDriverWait(self.driver, 10).until(
-            EC.presence_of_element_located(
-                (By.CSS_SELECTOR, 'div[contenteditable="true"][data-tab="10"]')
-            )
+        message_box = self._wait10.until(
+            EC.element_to_be_clickable(self._MESSAGE_BOX_SEL)
         )
         message_box.click()
-        time.sleep(randomize_wait())
         message_box.send_keys(message)
-        time.sleep(randomize_wait())
         message_box.send_keys(Keys.ENTER)
-        time.sleep(randomize_wait())
+        # the box empties once WhatsApp accepts the message; waiting on
+        # that replaces the former post-send sleep
+        self._wait10.until(
+            lambda d: not message_box.get_attribute("innerText").strip()
+        )
+
+    def send_message_stream(self, chunks, min_chunk_chars=20):
+        # progressive send for streamed LLM responses: starts typing as
+        # soon as the first chunk arrives instead of waiting for the
+        # full text, so wall time is max(generation, typing) rather
+        # than their sum. Chunks are buffered to ~min_chunk_chars to
+        # avoid a DOM write per token.
+        print("Sending streamed message")
+        message_box = self._wait10.until(
+            EC.presence_of_element_located(self._MESSAGE_BOX_SEL)
+        )
+        message_box.click()
+        buffer = ""
+        sent_any = False
+        for chunk in chunks:
+            buffer += chunk
+            if len(buffer) >= min_chunk_chars:
+                message_box.send_keys(buffer)
+                sent_any = True
+                buffer = ""
+        if buffer:
+            message_box.send_keys(buffer)
+            sent_any = True
+        if sent_any:
+            message_box.send_keys(Keys.ENTER)
 
     def get_image_base64(self, img_url):
-        # this function opens img blob in new tab, gets the base64
-        # of it, then closes tab
-        self.driver.execute_script(f'window.open("{img_url}");')
-        self.driver.switch_to.window(self.driver.window_handles[-1])
-        time.sleep(randomize_wait())
+        # fetch the blob in the current tab and let FileReader produce
+        # the base64: browser-native encoding, no hand-rolled encoder,
+        # no intermediate 4/3-sized JS array, and none of the old
+        # window.open/switch/close churn with its sleeps. The helper is
+        # installed at login; re-install lazily in case of a reload.
         result = self.driver.execute_async_script("""
             var uri = arguments[0];
-            var callback = arguments[1];
-            var toBase64 = function(buffer) {
-                for (var r, n = new Uint8Array(buffer), t = n.length, a = new Uint8Array(4 * Math.ceil(t / 3)), i = new Uint8Array(64), o = 0, c = 0; 64 > c; ++c)
-                    i[c] = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/".charCodeAt(c);
-                for (c = 0; t - t % 3 > c; c += 3, o += 4)
-                    r = n[c] << 16 | n[c + 1] << 8 | n[c + 2],
-                    a[o] = i[r >> 18],
-                    a[o + 1] = i[r >> 12 & 63],
-                    a[o + 2] = i[r >> 6 & 63],
-                    a[o + 3] = i[63 & r];
-                return t % 3 === 1 ? (r = n[t - 1], a[o] = i[r >> 2], a[o + 1] = i[r << 4 & 63], a[o + 2] = 61, a[o + 3] = 61) : t % 3 === 2 && (r = (n[t - 2] << 8) + n[t - 1], a[o] = i[r >> 10], a[o + 1] = i[r >> 4 & 63], a[o + 2] = i[r << 2 & 63], a[o + 3] = 61),
-                new TextDecoder("ascii").decode(a);
-            };
-            var xhr = new XMLHttpRequest();
-            xhr.responseType = 'arraybuffer';
-            xhr.onload = function() { callback(toBase64(xhr.response)); };
-            xhr.onerror = function() { callback(xhr.status); };
-            xhr.open('GET', uri);
-            xhr.send();
-            """, img_url)
-        if isinstance(result, int):
-            raise Exception("Request failed with status %s" % result)
-        time.sleep(randomize_wait())
-        self.driver.close()
-        self.driver.switch_to.window(self.driver.window_handles[0])
+            var callback = arguments[arguments.length - 1];
+            if (!window.__fetchImageB64) { %s }
+            window.__fetchImageB64(uri, callback);
+            """ % _FETCH_IMAGE_HELPER_JS, img_url)
+        if isinstance(result, dict):
+            raise Exception("Image fetch failed: %s" % result.get("error"))
         return result